@@ -1,9 +1,16 @@
 import sqlite3
 import hashlib
+import os
 import sys
+import unicodedata
+import cv2
 from datetime import datetime, date, time
 from threading import Lock
 from db import crear_base_de_datos
+from procesamiento import crear_sticker_qr
+from bitacora import obtener_logger
+
+log = obtener_logger("gestor")
 
 class GestorCedulas:
     # Variable de clase para almacenar la única instancia
@@ -34,10 +41,10 @@ class GestorCedulas:
                 # Configurar para que devuelva filas como diccionarios
                 self.conexion.row_factory = sqlite3.Row
                 self.cursor = self.conexion.cursor()
-                print(f"Conexión exitosa a la base de datos SQLite: {db_file}")
+                log.info("Conexión exitosa a la base de datos SQLite: %s", db_file)
                 self._initialized = True
             except sqlite3.Error as e:
-                print(f"Error al conectar a SQLite: {e}")
+                log.error("Error al conectar a SQLite: %s", e)
                 sys.exit(1)
 
     def cerrar_conexion(self):
@@ -45,7 +52,7 @@ class GestorCedulas:
         if hasattr(self, 'conexion'):
             self.cursor.close()
             self.conexion.close()
-            print("Conexión cerrada")
+            log.info("Conexión cerrada")
             # Resetear la instancia para permitir reconexión si es necesario
             with self._lock:
                 GestorCedulas._instance = None
@@ -78,10 +85,10 @@ class GestorCedulas:
             valores = (nombre, cedula, codigo_hash, especialidad, anio, seccion, ruta_img_estudiante)
             self.cursor.execute(consulta, valores)
             self.conexion.commit()
-            print(f"Registro creado exitosamente. ID: {self.cursor.lastrowid}")
+            log.info("Registro creado exitosamente. ID: %s", self.cursor.lastrowid)
             return True
         except sqlite3.Error as e:
-            print(f"Error al crear registro: {e}")
+            log.error("Error al crear registro: %s", e)
             return False
 
     def buscar_por_cedula(self, cedula):
@@ -94,12 +101,59 @@ class GestorCedulas:
             if registro:
                 return dict(registro)
             else:
-                print("No se encontró ningún registro con esa cédula")
+                log.debug("No se encontró ningún registro con esa cédula")
                 return None
         except sqlite3.Error as e:
-            print(f"Error al buscar registro: {e}")
+            log.error("Error al buscar registro: %s", e)
+            return None
+
+    def evaluar_acceso(self, cedula):
+        """Decisión de acceso de una cédula leída: su registro (o None) y si ya pasó hoy"""
+        return {
+            "registro": self.buscar_por_cedula(cedula),
+            "ya_paso_hoy": len(self.buscar_historial_por_cedula(cedula)) > 1,
+        }
+
+    def buscar_por_hash(self, codigo_hash):
+        """Busca un registro por su código hash (el contenido del sticker QR) usando idx_hash"""
+        try:
+            consulta = "SELECT * FROM cedulas_registradas WHERE codigo_hash = ?"
+            # Cursor propio: el escáner consulta desde su hilo de captura mientras la UI usa self.cursor
+            registro = self.conexion.execute(consulta, (codigo_hash,)).fetchone()
+            return dict(registro) if registro else None
+        except sqlite3.Error as e:
+            log.error("Error al buscar registro por hash: %s", e)
             return None
 
+    def generar_qr(self, cedula, directorio="assets/qr"):
+        """Genera el sticker QR imprimible de un estudiante registrado; devuelve la ruta del PNG"""
+        registro = self.buscar_por_cedula(cedula)
+        if not registro:
+            return None
+        try:
+            os.makedirs(directorio, exist_ok=True)
+            # cv2.putText solo dibuja ASCII: quitar tildes del nombre
+            nombre = unicodedata.normalize("NFKD", registro["nombre_estudiante"]).encode("ascii", "ignore").decode()
+            sticker = crear_sticker_qr(registro["codigo_hash"], leyendas=(nombre, f"Cedula: {cedula}"))
+            ruta = os.path.join(directorio, f"{cedula}.png")
+            if not cv2.imwrite(ruta, sticker):
+                log.error("Error al guardar el QR en %s", ruta)
+                return None
+            log.info("QR generado: %s", ruta)
+            return ruta
+        except Exception as e:
+            log.error("Error al generar QR: %s", e)
+            return None
+
+    def generar_qr_todos(self, directorio="assets/qr"):
+        """Genera los stickers QR de todos los registros; devuelve las rutas creadas"""
+        rutas = []
+        for registro in self.listar_registros():
+            ruta = self.generar_qr(registro["numero_de_cedula"], directorio)
+            if ruta:
+                rutas.append(ruta)
+        return rutas
+
     def listar_registros(self):
         try:
             consulta = "SELECT * FROM cedulas_registradas"
@@ -112,7 +166,7 @@ class GestorCedulas:
             else:
                 return []
         except sqlite3.Error as e:
-            print(f"Error al listar registros: {e}")
+            log.error("Error al listar registros: %s", e)
             return []
 
     def actualizar_registro(self, cedula, datos):
@@ -128,7 +182,7 @@ class GestorCedulas:
                     valores.append(valor)
             
             if not actualizaciones:
-                print("No hay campos válidos para actualizar")
+                log.debug("No hay campos válidos para actualizar")
                 return False
                 
             consulta = f"UPDATE cedulas_registradas SET {', '.join(actualizaciones)} WHERE numero_de_cedula = ?"
@@ -138,13 +192,13 @@ class GestorCedulas:
             self.conexion.commit()
             
             if self.cursor.rowcount > 0:
-                print(f"Registro actualizado exitosamente")
+                log.info("Registro actualizado exitosamente")
                 return True
             else:
-                print("No se encontró el registro o no se realizaron cambios")
+                log.debug("No se encontró el registro o no se realizaron cambios")
                 return False
         except sqlite3.Error as e:
-            print(f"Error al actualizar registro: {e}")
+            log.error("Error al actualizar registro: %s", e)
             return False
 
     def eliminar_registro(self, cedula):
@@ -155,13 +209,13 @@ class GestorCedulas:
             self.conexion.commit()
             
             if self.cursor.rowcount > 0:
-                print(f"Registro eliminado exitosamente")
+                log.info("Registro eliminado exitosamente")
                 return True
             else:
-                print("No se encontró el registro para eliminar")
+                log.debug("No se encontró el registro para eliminar")
                 return False
         except sqlite3.Error as e:
-            print(f"Error al eliminar registro: {e}")
+            log.error("Error al eliminar registro: %s", e)
             return False
 
     # Operaciones CRUD para historial
@@ -185,11 +239,11 @@ class GestorCedulas:
             valores = (cedula, dia, hora, becado)
             self.cursor.execute(consulta, valores)
             self.conexion.commit()
-            print(f"Entrada de historial agregada exitosamente. ID: {self.cursor.lastrowid}")
+            log.info("Entrada de historial agregada exitosamente. ID: %s", self.cursor.lastrowid)
             return True
             
         except sqlite3.Error as e:
-            print(f"Error al agregar entrada al historial: {e}")
+            log.error("Error al agregar entrada al historial: %s", e)
             return False
 
     def buscar_historial_por_cedula(self, cedula):
@@ -208,10 +262,10 @@ class GestorCedulas:
                 return [dict(registro) for registro in registros]
             
             else:
-                print("No se encontró historial para esa cédula")
+                log.debug("No se encontró historial para esa cédula")
                 return []
         except sqlite3.Error as e:
-            print(f"Error al buscar historial: {e}")
+            log.error("Error al buscar historial: %s", e)
             return []
 
     def buscar_historial_por_fecha(self, fecha):
@@ -228,10 +282,10 @@ class GestorCedulas:
             if registros:
                 return [dict(registro) for registro in registros]
             else:
-                print(f"No se encontraron registros para la fecha {fecha}")
+                log.debug("No se encontraron registros para la fecha %s", fecha)
                 return []
         except sqlite3.Error as e:
-            print(f"Error al buscar historial por fecha: {e}")
+            log.error("Error al buscar historial por fecha: %s", e)
             return []
 
     def listar_historial_completo(self):
@@ -247,10 +301,10 @@ class GestorCedulas:
             if registros:
                 return [dict(registro) for registro in registros]
             else:
-                print("No hay registros en el historial")
+                log.debug("No hay registros en el historial")
                 return []
         except sqlite3.Error as e:
-            print(f"Error al listar historial: {e}")
+            log.error("Error al listar historial: %s", e)
             return []
 
     def eliminar_entrada_historial(self, id_historial):
@@ -261,13 +315,13 @@ class GestorCedulas:
             self.conexion.commit()
             
             if self.cursor.rowcount > 0:
-                print(f"Entrada de historial eliminada exitosamente")
+                log.info("Entrada de historial eliminada exitosamente")
                 return True
             else:
-                print("No se encontró la entrada del historial para eliminar")
+                log.debug("No se encontró la entrada del historial para eliminar")
                 return False
         except sqlite3.Error as e:
-            print(f"Error al eliminar entrada del historial: {e}")
+            log.error("Error al eliminar entrada del historial: %s", e)
             return False
 
     def limpiar_historial_por_cedula(self, cedula):
@@ -278,13 +332,13 @@ class GestorCedulas:
             self.conexion.commit()
             
             if self.cursor.rowcount > 0:
-                print(f"Historial limpiado para la cédula {cedula}. {self.cursor.rowcount} entradas eliminadas")
+                log.info("Historial limpiado para la cédula %s. %s entradas eliminadas", cedula, self.cursor.rowcount)
                 return True
             else:
-                print("No se encontraron entradas del historial para esa cédula")
+                log.debug("No se encontraron entradas del historial para esa cédula")
                 return False
         except sqlite3.Error as e:
-            print(f"Error al limpiar historial: {e}")
+            log.error("Error al limpiar historial: %s", e)
             return False
 
 
@@ -1,22 +1,279 @@
 import cv2
-import easyocr
 import numpy as np
 import threading
 import time
 from typing import Callable
-from PIL import Image
-from io import BytesIO
 import queue
+from collections import deque
+from procesamiento import puntuar_nitidez, CodificadorPreview, LectorQR
+from consenso import VotadorConsenso
+from motor_ocr import MotorOCR
+from pool_ocr import PoolOCR
+from fuentes_video import FuenteFrames, FuenteCamara
+from controlador_performance import ControladorPerformance
+from metricas import MetricasEtapas
+from bitacora import obtener_logger
+
+log = obtener_logger("escaner")
+
+
+class RanuraUltimoFrame:
+    """Ranura de un solo frame: el más reciente reemplaza al pendiente y el viejo se descarta"""
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._frame = None
+        self.publicados = 0
+        self.descartados = 0
+
+    def publicar(self, frame):
+        """Deja el frame disponible para el consumidor; devuelve el que no alcanzó a tomar (o None)"""
+        with self._condicion:
+            desplazado = self._frame
+            if desplazado is not None:
+                self.descartados += 1
+            self._frame = frame
+            self.publicados += 1
+            self._condicion.notify()
+            return desplazado
+
+    def tomar(self, timeout=None):
+        """Espera hasta que haya un frame disponible y lo retira de la ranura"""
+        with self._condicion:
+            if self._frame is None:
+                self._condicion.wait(timeout)
+            frame = self._frame
+            self._frame = None
+            return frame
+
+    def limpiar(self):
+        """Descarta el frame pendiente sin contarlo como perdido y lo devuelve"""
+        with self._condicion:
+            pendiente = self._frame
+            self._frame = None
+            return pendiente
+
+
+class AnilloFrames:
+    """
+    Buffers de frame preasignados que se reutilizan entre capturas. Cada buffer lleva un conteo
+    de referencias: la captura, el mejor frame del intervalo y la vista previa lo retienen y
+    lo liberan explícitamente, y solo se vuelve a escribir cuando nadie lo usa.
+    """
+    def __init__(self, tamano=6):
+        self._lock = threading.Lock()
+        self.buffers = [None] * tamano  # Se reservan con la forma del primer frame leído
+        self.referencias = [0] * tamano
+        self._siguiente = 0
+        self.sin_buffer = 0  # Capturas perdidas porque todos los buffers estaban en uso
+
+    def adquirir(self):
+        """Reserva un buffer libre para escribir un frame nuevo; devuelve su índice o None"""
+        with self._lock:
+            tamano = len(self.buffers)
+            for paso in range(tamano):
+                indice = (self._siguiente + paso) % tamano
+                if self.referencias[indice] == 0:
+                    self.referencias[indice] = 1
+                    self._siguiente = (indice + 1) % tamano
+                    return indice
+            self.sin_buffer += 1
+            return None
+
+    def retener(self, indice):
+        with self._lock:
+            self.referencias[indice] += 1
+
+    def liberar(self, indice):
+        with self._lock:
+            self.referencias[indice] -= 1
+
+    def buffer(self, indice):
+        return self.buffers[indice]
+
+    def asignar(self, indice, frame):
+        """Guarda el arreglo leído como buffer del índice (solo cambia si la forma no coincidía)"""
+        self.buffers[indice] = frame
+
+
+class CreditosPreview:
+    """
+    Créditos que la UI concede a la vista previa: cada frame enviado consume uno y cada
+    confirmación de la UI lo devuelve. Un crédito sin confirmar vence para no trabar el envío.
+    """
+    def __init__(self, maximo=0, expiracion=1.0):
+        self._condicion = threading.Condition()
+        self.maximo = maximo  # 0 desactiva el control por créditos
+        self.expiracion = expiracion
+        self.disponibles = maximo
+        self._consumos = deque()
+        self.vencidos = 0
+
+    def configurar(self, maximo):
+        with self._condicion:
+            self.maximo = maximo
+            self.disponibles = maximo
+            self._consumos.clear()
+            self._condicion.notify_all()
+
+    def esperar(self, timeout):
+        """Consume un crédito esperando hasta timeout; devuelve False si la UI sigue ocupada"""
+        if self.maximo <= 0:
+            return True
+        fin = time.monotonic() + timeout
+        with self._condicion:
+            while self.disponibles <= 0:
+                self._recuperar_vencidos()
+                if self.disponibles > 0:
+                    break
+                restante = fin - time.monotonic()
+                if restante <= 0:
+                    return False
+                self._condicion.wait(min(restante, 0.05))
+            self.disponibles -= 1
+            self._consumos.append(time.monotonic())
+            return True
+
+    def confirmar(self):
+        """Devuelve un crédito (la UI terminó con un frame o no se usó el crédito)"""
+        if self.maximo <= 0:
+            return
+        with self._condicion:
+            if self._consumos:
+                self._consumos.popleft()
+                self.disponibles = min(self.maximo, self.disponibles + 1)
+                self._condicion.notify()
+
+    def _recuperar_vencidos(self):
+        ahora = time.monotonic()
+        while self._consumos and ahora - self._consumos[0] > self.expiracion:
+            self._consumos.popleft()
+            self.disponibles = min(self.maximo, self.disponibles + 1)
+            self.vencidos += 1
+
+
+class DespachadorEventos:
+    """
+    Entrega los eventos del escáner (cédula encontrada, fallo) en orden desde un único hilo.
+    La cola es acotada: con la cola llena un fallo se descarta y una cédula desplaza al fallo
+    pendiente más antiguo. Al detenerse entrega las cédulas pendientes y ya no acepta eventos.
+    Mide cuánto espera cada evento en la cola y cuánto tarda su callback.
+    """
+    def __init__(self, maximo=32, metricas: MetricasEtapas = None):
+        self.maximo = maximo
+        self._eventos = deque()
+        self._condicion = threading.Condition()
+        self.metricas = metricas if metricas is not None else MetricasEtapas()
+        self.hilo = None
+        self._detener = None  # Evento propio de cada hilo: un hilo viejo no sigue consumiendo tras reiniciar
+        self._lock = threading.Lock()
+        self.entregados = 0
+        self.descartados = 0
+
+    def iniciar(self):
+        with self._lock:
+            if self.hilo is not None and not self._detener.is_set():
+                return
+            self._detener = threading.Event()
+            self.hilo = threading.Thread(target=self._loop, args=(self._detener,), daemon=True)
+            self.hilo.start()
+
+    def activo(self):
+        return self.hilo is not None
+
+    def detener(self, timeout=1.0):
+        """Detiene el hilo tras entregar las cédulas pendientes; los fallos pendientes se descartan"""
+        with self._lock:
+            hilo, detener = self.hilo, self._detener
+            with self._condicion:
+                # Desde acá publicar() rechaza eventos nuevos
+                self.hilo = None
+        if hilo is None:
+            return
+        detener.set()
+        with self._condicion:
+            self._condicion.notify_all()
+        if hilo is threading.current_thread():
+            # Detenido desde un callback: el propio hilo vacía la cola al volver a _loop
+            return
+        hilo.join(timeout=timeout)
+        if not hilo.is_alive():
+            return
+        # Un callback lento retiene el hilo; lo que quede ya no se entrega
+        with self._condicion:
+            self.descartados += len(self._eventos)
+            self._eventos.clear()
+            self._condicion.notify_all()
+
+    def publicar(self, nombre, callback, *args, descartable=False, timeout=1.0):
+        """Encola callback(*args); devuelve False si el evento se descartó (cola llena o despachador detenido)"""
+        evento = (nombre, callback, args, time.perf_counter(), descartable)
+        with self._condicion:
+            if self.hilo is None:
+                self.descartados += 1
+                log.debug("Despachador detenido: se descartó el evento '%s'", nombre)
+                return False
+            if len(self._eventos) >= self.maximo:
+                if descartable:
+                    self.descartados += 1
+                    return False
+                # Un evento que no se puede perder desplaza al descartable más antiguo
+                for pendiente in self._eventos:
+                    if pendiente[4]:
+                        self._eventos.remove(pendiente)
+                        self.descartados += 1
+                        break
+                else:
+                    # Todo lo pendiente son cédulas: esperar a que el hilo libere lugar
+                    if not self._condicion.wait_for(lambda: len(self._eventos) < self.maximo, timeout):
+                        self.descartados += 1
+                        log.error("Cola de eventos llena: se descartó el evento '%s'", nombre)
+                        return False
+            self._eventos.append(evento)
+            self._condicion.notify_all()
+        return True
+
+    def pendientes(self):
+        return len(self._eventos)
+
+    def _loop(self, detener):
+        while True:
+            with self._condicion:
+                while not self._eventos and not detener.is_set():
+                    self._condicion.wait(0.1)
+                if detener.is_set():
+                    # Las cédulas ya marcaron la lectura como resuelta: se entregan igual
+                    finales = [evento for evento in self._eventos if not evento[4]]
+                    self.descartados += len(self._eventos) - len(finales)
+                    self._eventos.clear()
+                    self._condicion.notify_all()
+                    break
+                evento = self._eventos.popleft()
+                self._condicion.notify_all()
+            self._entregar(evento)
+        for evento in finales:
+            self._entregar(evento)
+
+    def _entregar(self, evento):
+        nombre, callback, args, instante, _ = evento
+        self.metricas.registrar(f"espera_{nombre}", time.perf_counter() - instante)
+        try:
+            with self.metricas.medir(f"callback_{nombre}"):
+                callback(*args)
+        except Exception as e:
+            log.error("Error en el callback del evento '%s': %s", nombre, e)
+        self.entregados += 1
+
 
 class EscanerCedula:
-    def __init__(self, on_cedula_found: Callable[[str], None], on_scan_failed: Callable[[], None], on_frame_update: Callable[[bytes], None]):
+    def __init__(self, on_cedula_found: Callable[[str], None], on_scan_failed: Callable[[], None], on_frame_update: Callable[[bytes], None] = None, fuente: FuenteFrames = None):
         self.reader = None
-        self.cap = None
+        self.fuente = fuente if fuente is not None else FuenteCamara(0)  # Cámara, video, imágenes o frames en memoria
         self.running = False
-        self.frame = None
+        self.pausado = False
+        self.captura_thread = None
         self.on_cedula_found = on_cedula_found
         self.on_scan_failed = on_scan_failed
-        self.on_frame_update = on_frame_update
+        self.on_frame_update = on_frame_update  # None: sin vista previa (modo sin interfaz), no se codifica nada
         
         # Configuración de performance
         self.target_fps = 30
@@ -27,64 +284,350 @@ class EscanerCedula:
         self.ocr_thread = None
         self.ocr_running = False
         
+        # Lotes de OCR: las cajas de varios frames se reconocen en una sola llamada (1 = frame a frame)
+        self.tamano_lote = 1
+        self.espera_lote = 0.05  # Segundos máximos esperando completar un lote tras el primer frame
+        
+        # Buffers de captura reutilizables; la ranura de vista previa y el mejor frame guardan índices
+        self.anillo = AnilloFrames(tamano=6)
+        
+        # Detección a dibujar sobre la vista previa; se compone al codificar, nunca sobre el buffer
+        self.superposicion = None
+        self.duracion_superposicion = 1.0
+        
+        # Hilo único de codificación para la vista previa (el último frame gana)
+        self.preview_slot = RanuraUltimoFrame()
+        self.preview_thread = None
+        self.preview_running = False
+        self.frames_codificados = 0
+        
         # Cache y optimizaciones
         self.last_ocr_time = 0
         self.ocr_interval = 0.25  # Procesar OCR cada 250ms
         self.frame_skip_counter = 0
         self.frame_skip_rate = 2  # Procesar 1 de cada 3 frames para OCR
         
+        # Selección del frame más nítido de cada intervalo de OCR
+        self.mejor_indice = None
+        self.mejor_nitidez = -1.0
+        self._lock_mejor = threading.RLock()  # pausar/reanudar pueden soltar el mejor frame desde otro hilo
+        self.nitidez_minima = 0.0  # Intervalos cuyo mejor frame no llegue a este puntaje no van al OCR
+        
         # Configuración de imagen
         self.resize_factor = 0.6  # Reducir tamaño para procesamiento
-        self.jpeg_quality = 70  # Reducir calidad para transmisión más rápida
+        
+        # Vista previa: tamaño y calidad independientes de la configuración del OCR
+        self.codificador_preview = CodificadorPreview(ancho=800, calidad=70)
+        self.preview_fps = 12  # Ritmo propio de la vista previa, independiente de target_fps
+        self.creditos_preview = CreditosPreview(maximo=0)  # La UI habilita créditos con configurar_preview
+        self._proximo_preview = 0.0
+        
+        # Motor OCR (localización, preprocesamiento y lectura); ver MotorOCR para sus opciones
+        self.motor = MotorOCR()
+        self.frames_sin_cedula = 0
+        
+        # Contadores básicos del pipeline
+        self.frames_capturados = 0
+        self.ocr_encolados = 0
+        self.ocr_descartados = 0  # Frames que salieron de la cola de OCR sin procesarse
+        self.ocr_procesados = 0
+        self.detecciones = 0
+        self.latencias_ocr = deque(maxlen=20)
+        self.tiempo_ocr_total = 0.0
+        
+        # Histogramas de latencia por etapa (las del OCR por dentro están en motor.metricas)
+        self.metricas = MetricasEtapas()
+        
+        # Control adaptativo de ocr_interval, resize_factor, frame_skip_rate y target_fps
+        self.control_adaptativo = True
+        self.controlador = ControladorPerformance(self)
+        
+        # OCR en procesos separados: 0 lo ejecuta en el hilo OCR de este proceso
+        self.procesos_ocr = 0
+        self.pool_ocr = None
+        
+        # Con varias cámaras, un planificador compartido atiende la cola OCR de cada escáner
+        self.planificador = None
+        self.id_camara = None
+        
+        # Votación entre frames: solo se notifica una cédula cuando la lectura es estable
+        self.confianza_minima = 0.25
+        self.consenso = VotadorConsenso(ventana=5, umbral_acuerdo=0.6)
+        self.consenso_alcanzado = False  # Detiene el OCR hasta el próximo iniciar_escaneo o reanudar
+        self._lock_notificacion = threading.Lock()  # El QR (captura) y el OCR pueden resolver a la vez
+        
+        # Corrección hacia cédulas registradas (IndiceCedulas); None lee sin consultar el registro
+        self.indice_cedulas = None
+        self.confianza_minima_registrada = 0.1  # Lecturas más dudosas se aceptan si corrigen a una cédula registrada
+        self.confianza_exacta_registrada = 0.4  # Coincidencia exacta con el registro a partir de esta confianza notifica de inmediato
+        self.correcciones = 0
+        
+        # Un único hilo entrega en orden las cédulas y los fallos a los callbacks (ver DespachadorEventos);
+        # con varias cámaras GestorMultiCamara lo reemplaza por uno compartido
+        self.despachador = DespachadorEventos(metricas=self.metricas)
+        self._despachador_propio = self.despachador
+        
+        # Vía rápida por QR: se intenta antes del OCR; ver activar_qr
+        self.lector_qr = None
+        self.resolver_hash = None  # codigo_hash -> número de cédula (o None si no está registrado)
+        self.intervalo_qr = 0.1
+        self._ultimo_qr = 0.0
+        self.qr_intentos = 0
+        self.qr_detecciones = 0
+        
+        # Pausa/reanudación sin recargar el modelo ni reabrir la cámara
+        self._evento_reanudar = threading.Event()
+        self._instante_reanudar = None
+        self.latencias_reinicio = deque(maxlen=50)  # Segundos desde iniciar/reanudar hasta el primer frame
 
     def inicializar(self):
-        """Inicializa el lector OCR y la cámara con configuraciones optimizadas"""
-        print("[INFO] Iniciando EasyOCR...")
-        # Inicializar EasyOCR con configuraciones de performance
-        self.reader = easyocr.Reader(['es'], gpu=True)  # Usar GPU si está disponible
-        
-        print("[INFO] Iniciando cámara...")
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
-            raise Exception("No se pudo abrir la cámara")
-        
-        # Optimizar configuración de la cámara
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Buffer mínimo para reducir latencia
+        """Inicializa el lector OCR y la cámara con configuraciones optimizadas (solo lo que no esté cargado)"""
+        # La fuente primero: los buffers del pool OCR se dimensionan con su resolución
+        if not self.fuente.esta_abierta():
+            log.info("Iniciando fuente de video (%s)...", type(self.fuente).__name__)
+            self.fuente.abrir()
         
+        if self.planificador is not None:
+            # El modelo (o pool) lo carga el planificador compartido
+            pass
+        elif self.procesos_ocr > 0:
+            if self.pool_ocr is None:
+                self._iniciar_pool_ocr()
+        elif not self.motor.listo():
+            log.info("Iniciando EasyOCR...")
+            self.reader = self.motor.cargar()
         return True
 
+    def _iniciar_pool_ocr(self):
+        """Lanza los procesos OCR; cada proceso carga su propio modelo y este no necesita EasyOCR"""
+        opciones = {}
+        bytes_por_frame = self._bytes_frame_ocr()
+        if bytes_por_frame:
+            opciones["bytes_por_frame"] = bytes_por_frame
+        self.pool_ocr = PoolOCR(
+            self.procesos_ocr,
+            on_resultado=self._atender_lecturas,
+            config_motor=self._config_motor(),
+            **opciones
+        )
+        self.pool_ocr.iniciar()
+
+    def _bytes_frame_ocr(self):
+        """Tamaño del mayor frame que puede llegar al OCR: resolución de la fuente al resize_factor máximo"""
+        resolucion = self.fuente.resolucion()
+        if not resolucion:
+            return None
+        ancho, alto = resolucion
+        # El control adaptativo puede subir resize_factor hasta su límite mientras el pool sigue vivo
+        factor = max(self.resize_factor, self.controlador.limites["resize_factor"][1])
+        return int(ancho * factor) * int(alto * factor) * 3
+
+    def _liberar_camara(self):
+        """Cierra la cámara (o fuente de video) conservando el modelo OCR cargado"""
+        self.fuente.liberar()
+
     def liberar_recursos(self):
         """Libera los recursos de la cámara y detiene hilos"""
         self.ocr_running = False
+        self.preview_running = False
+        if self.captura_thread and self.captura_thread.is_alive() and self.captura_thread is not threading.current_thread():
+            self.captura_thread.join(timeout=1.0)
         if self.ocr_thread and self.ocr_thread.is_alive():
             self.ocr_thread.join(timeout=1.0)
-            
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
-            self.cap = None
+        if self.preview_thread and self.preview_thread.is_alive() and self.preview_thread is not threading.current_thread():
+            self.preview_thread.join(timeout=1.0)
+        self._liberar_preview_pendiente()
+        
+        if self.pool_ocr:
+            self.pool_ocr.cerrar()
+            self.pool_ocr = None
+        
+        self._liberar_camara()
 
     def iniciar_escaneo(self):
-        """Inicia los hilos de escaneo"""
+        """Inicia los hilos de escaneo (si ya están corriendo, equivale a reanudar)"""
         if self.running:
+            self.reanudar()
             return
         
+        # Esperar a que termine un hilo de captura anterior antes de compartir la cámara
+        if self.captura_thread and self.captura_thread.is_alive():
+            self.captura_thread.join(timeout=1.0)
+        
+        self._preparar_nueva_lectura()
+        self._instante_reanudar = time.perf_counter()
+        self.pausado = False
+        self._evento_reanudar.set()
+        
         self.running = True
         self.ocr_running = True
+        self.preview_running = self.on_frame_update is not None
+        
+        # Antes que los hilos: un evento publicado con el despachador detenido se descarta
+        self.despachador.iniciar()
+        
+        # Iniciar hilo de procesamiento OCR separado (con planificador compartido no hace falta)
+        if self.planificador is None:
+            self.ocr_thread = threading.Thread(target=self._loop_ocr, daemon=True)
+            self.ocr_thread.start()
         
-        # Iniciar hilo de procesamiento OCR separado
-        self.ocr_thread = threading.Thread(target=self._loop_ocr, daemon=True)
-        self.ocr_thread.start()
+        # Iniciar hilo persistente de codificación de la vista previa
+        if self.preview_running:
+            self.preview_thread = threading.Thread(target=self._loop_preview, daemon=True)
+            self.preview_thread.start()
         
         # Iniciar hilo principal de captura
-        threading.Thread(target=self._loop_captura, daemon=True).start()
+        self.captura_thread = threading.Thread(target=self._loop_captura, daemon=True)
+        self.captura_thread.start()
+        
+        if self.control_adaptativo:
+            self.controlador.ajustar_a_fuente(self.fuente)
+            self.controlador.iniciar()
 
     def detener_escaneo(self):
-        """Detiene todos los hilos de escaneo"""
+        """Detiene todos los hilos de escaneo y cierra la cámara; el modelo OCR queda cargado"""
         self.running = False
         self.ocr_running = False
+        self.preview_running = False
+        self._evento_reanudar.set()
+        self.controlador.detener()
+        if self.despachador is self._despachador_propio:
+            self.despachador.detener()
+
+    def pausar(self):
+        """Suspende captura y OCR dejando cámara y modelo listos para reanudar al instante"""
+        self.pausado = True
+        self._evento_reanudar.clear()
+        self._preparar_nueva_lectura()
+
+    def reanudar(self):
+        """Reanuda el escaneo tras pausar(); si los hilos no están corriendo los inicia"""
+        if not self.running:
+            self.iniciar_escaneo()
+            return
+        
+        self._preparar_nueva_lectura()
+        self._instante_reanudar = time.perf_counter()
+        self.pausado = False
+        self._evento_reanudar.set()
+
+    def cerrar(self):
+        """Desmontaje explícito: detiene los hilos y libera cámara, procesos OCR y modelo"""
+        self.detener_escaneo()
+        self.liberar_recursos()
+        self.motor.reader = None
+        self.reader = None
+
+    def _preparar_nueva_lectura(self):
+        """Olvida votos, frames pendientes y el estado de consenso para empezar con un estudiante nuevo"""
+        self.consenso_alcanzado = False
+        self.consenso.reiniciar()
+        self._soltar_mejor_frame()
+        self.last_ocr_time = 0
+        self._ultimo_qr = 0.0
+        self.superposicion = None
+        self._liberar_preview_pendiente()
+        try:
+            while True:
+                self.ocr_queue.get_nowait()
+                self._ocr_terminado()
+        except queue.Empty:
+            pass
+
+    def _ocr_terminado(self, cantidad=1):
+        """Descuenta frames sacados de la cola OCR que ya se atendieron o se tiraron"""
+        for _ in range(cantidad):
+            try:
+                self.ocr_queue.task_done()
+            except ValueError:
+                # configurar_lote() reemplazó la cola mientras el frame estaba en proceso
+                break
+
+    def ocr_pendiente(self):
+        """Frames encolados, en proceso o enviados al pool cuyo resultado todavía no se atendió"""
+        return self.ocr_queue.unfinished_tasks + (self.pool_ocr.pendientes() if self.pool_ocr else 0)
+
+    def _esperar_ocr_pendiente(self, timeout=5.0):
+        """Espera a que el OCR atienda los frames que ya tiene; devuelve False si se agotó el tiempo"""
+        limite = time.monotonic() + timeout
+        while self.ocr_running and self.ocr_pendiente():
+            if time.monotonic() >= limite:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def obtener_latencia_reinicio(self):
+        """Resume el tiempo desde iniciar/reanudar hasta el primer frame capturado"""
+        muestras = list(self.latencias_reinicio)
+        return {
+            "ultima": muestras[-1] if muestras else None,
+            "promedio": sum(muestras) / len(muestras) if muestras else None,
+            "muestras": len(muestras),
+        }
+
+    def obtener_estadisticas(self):
+        """
+        Foto barata del estado del pipeline: contadores, cola OCR, vista previa, cola de eventos y
+        latencias por etapa (captura, redimensión, preprocesamiento, detección, reconocimiento,
+        codificación, espera y callback de cada evento). Con procesos OCR las etapas internas del
+        OCR quedan en los trabajadores.
+        """
+        etapas = self.metricas.resumen()
+        etapas.update(self.motor.metricas.resumen())
+        estadisticas = {
+            "contadores": {
+                "frames_capturados": self.frames_capturados,
+                "capturas_sin_buffer": self.anillo.sin_buffer,
+                "ocr_encolados": self.ocr_encolados,
+                "ocr_procesados": self.ocr_procesados,
+                "frames_sin_cedula": self.frames_sin_cedula,
+                "detecciones": self.detecciones,
+                "lecturas_por_deteccion": round(self.ocr_procesados / self.detecciones, 2) if self.detecciones else None,
+                "correcciones_registro": self.correcciones,
+                "qr_intentos": self.qr_intentos,
+                "qr_detecciones": self.qr_detecciones,
+                "lecturas_reconocedor": self.motor.lecturas_reconocedor,
+                "lecturas_easyocr": self.motor.lecturas_easyocr,
+            },
+            "cola_ocr": {
+                "pendientes": self.ocr_queue.qsize(),
+                "capacidad": self.ocr_queue.maxsize,
+                "descartados": self.ocr_descartados,
+                "tasa_descarte": round(self.ocr_descartados / self.ocr_encolados, 3) if self.ocr_encolados else 0.0,
+            },
+            "preview": self.obtener_estadisticas_preview(),
+            "eventos": {
+                "pendientes": self.despachador.pendientes(),
+                "entregados": self.despachador.entregados,
+                "descartados": self.despachador.descartados,
+            },
+            "etapas": etapas,
+            "parametros": {
+                "target_fps": self.target_fps,
+                "ocr_interval": self.ocr_interval,
+                "resize_factor": self.resize_factor,
+                "frame_skip_rate": self.frame_skip_rate,
+            },
+        }
+        if self.pool_ocr:
+            estadisticas["pool_ocr"] = {
+                "procesos": self.pool_ocr.num_procesos,
+                "procesos_vivos": self.pool_ocr.procesos_vivos(),
+                "reinicios": sum(self.pool_ocr.reinicios),
+                "trabajos_perdidos": self.pool_ocr.trabajos_perdidos,
+                "enviados": self.pool_ocr.enviados,
+                "descartados": self.pool_ocr.descartados,
+            }
+        return estadisticas
+
+    def obtener_estadisticas_preview(self):
+        """Devuelve cuántos frames de vista previa se codificaron y cuántos se descartaron"""
+        return {
+            "publicados": self.preview_slot.publicados,
+            "codificados": self.frames_codificados,
+            "descartados": self.preview_slot.descartados,
+            "creditos_vencidos": self.creditos_preview.vencidos,
+        }
 
     def _loop_captura(self):
         """Loop principal de captura de frames - optimizado para velocidad"""
@@ -94,47 +637,131 @@ class EscanerCedula:
         last_frame_time = time.time()
         
         while self.running:
+            if self.pausado:
+                # Cámara abierta y modelo cargado, pero sin procesar: solo se vacía el buffer
+                # (grab no decodifica) para que el primer frame al reanudar sea actual. Una fuente
+                # que no marca ritmo no acumula frames y descartar() volvería al instante: se espera
+                if not self.fuente.marca_ritmo() or not self.fuente.descartar():
+                    self._evento_reanudar.wait(0.1)
+                continue
+            
             start_time = time.time()
             
-            ret, frame = self.cap.read()
+            indice = self.anillo.adquirir()
+            if indice is None:
+                # Todos los buffers siguen en uso (vista previa u OCR atrasados): saltar este frame
+                self.fuente.descartar()
+                continue
+            
+            with self.metricas.medir("captura"):
+                ret, frame = self.fuente.leer(self.anillo.buffer(indice))
             if not ret or frame is None:
-                print("[ERROR] No se pudo leer el frame.")
+                self.anillo.liberar(indice)
+                if self.fuente.agotada():
+                    log.info("La fuente de video no tiene más frames.")
+                    # Los últimos frames siguen en el OCR: su cédula debe publicarse antes de detener
+                    if not self._esperar_ocr_pendiente():
+                        log.error("El OCR no terminó los últimos frames de la fuente a tiempo")
+                    self.detener_escaneo()
+                    break
+                log.error("No se pudo leer el frame.")
                 time.sleep(0.01)
                 continue
+            self.anillo.asignar(indice, frame)
 
-            self.frame = frame
+            if self._instante_reanudar is not None:
+                latencia = time.perf_counter() - self._instante_reanudar
+                self._instante_reanudar = None
+                self.latencias_reinicio.append(latencia)
+                log.debug("Primer frame tras iniciar/reanudar: %.0f ms", latencia * 1000)
+
+            self.frames_capturados += 1
+            
+            # Vía rápida: un sticker QR resuelve al estudiante sin esperar al OCR
+            if (self.lector_qr is not None and not self.consenso_alcanzado and
+                    time.time() - self._ultimo_qr >= self.intervalo_qr):
+                self._ultimo_qr = time.time()
+                with self.metricas.medir("qr"):
+                    self._intentar_qr(frame)
+            
+            # Conservar el frame más nítido del intervalo actual
+            if not self.consenso_alcanzado:
+                with self.metricas.medir("nitidez"):
+                    nitidez = puntuar_nitidez(frame)
+                with self._lock_mejor:
+                    if nitidez > self.mejor_nitidez:
+                        self.anillo.retener(indice)
+                        self._soltar_mejor_frame()
+                        self.mejor_nitidez = nitidez
+                        self.mejor_indice = indice
             
             # Enviar frame para OCR solo ocasionalmente
             current_time = time.time()
-            if (current_time - self.last_ocr_time > self.ocr_interval and 
+            if (not self.consenso_alcanzado and
+                current_time - self.last_ocr_time > self.ocr_interval and 
                 self.frame_skip_counter % self.frame_skip_rate == 0):
                 
                 self.last_ocr_time = current_time
-                # Enviar frame reducido para procesamiento OCR
-                frame_pequeno = self._redimensionar_frame_para_ocr(frame)
-                
-                try:
-                    self.ocr_queue.put_nowait(frame_pequeno)
-                except queue.Full:
-                    # Si la cola está llena, descartar frame antiguo
-                    try:
-                        self.ocr_queue.get_nowait()
-                        self.ocr_queue.put_nowait(frame_pequeno)
-                    except queue.Empty:
-                        pass
+                with self._lock_mejor:
+                    if self.mejor_indice is not None and self.mejor_nitidez >= self.nitidez_minima:
+                        # Enviar el mejor frame reducido para procesamiento OCR (la reducción es una copia)
+                        self._encolar_para_ocr(self._redimensionar_frame_para_ocr(self.anillo.buffer(self.mejor_indice)))
+                    self._soltar_mejor_frame()
             
             self.frame_skip_counter += 1
             
-            # Enviar frame a UI de forma asíncrona
-            threading.Thread(target=self._enviar_frame_a_ui, daemon=True).start()
+            # Publicar frame para el hilo de vista previa (descarta el pendiente si no se codificó)
+            if self.preview_running:
+                self.anillo.retener(indice)
+                desplazado = self.preview_slot.publicar(indice)
+                if desplazado is not None:
+                    self.anillo.liberar(desplazado)
+            
+            # La captura ya no necesita el buffer; queda en manos de la vista previa o del mejor frame
+            self.anillo.liberar(indice)
             
-            # Control de FPS
-            elapsed = time.time() - start_time
-            sleep_time = max(0, self.frame_delay - elapsed)
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+            # Control de FPS; una fuente sin ritmo propio (benchmark, tiempo_real=False) va a máxima velocidad
+            if self.fuente.marca_ritmo():
+                elapsed = time.time() - start_time
+                sleep_time = max(0, self.frame_delay - elapsed)
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
         
-        self.liberar_recursos()
+        self._liberar_camara()
+
+    def _soltar_mejor_frame(self):
+        """Libera el buffer del mejor frame del intervalo"""
+        with self._lock_mejor:
+            if self.mejor_indice is not None:
+                self.anillo.liberar(self.mejor_indice)
+            self.mejor_indice = None
+            self.mejor_nitidez = -1.0
+
+    def _liberar_preview_pendiente(self):
+        """Vacía la ranura de vista previa devolviendo su buffer al anillo"""
+        pendiente = self.preview_slot.limpiar()
+        if pendiente is not None:
+            self.anillo.liberar(pendiente)
+
+    def _encolar_para_ocr(self, frame_pequeno):
+        """Pone un frame en la cola de OCR descartando el más antiguo si está llena"""
+        self.ocr_encolados += 1
+        try:
+            self.ocr_queue.put_nowait(frame_pequeno)
+        except queue.Full:
+            # Si la cola está llena, descartar frame antiguo
+            try:
+                self.ocr_queue.get_nowait()
+                self._ocr_terminado()
+                self.ocr_descartados += 1
+                self.ocr_queue.put_nowait(frame_pequeno)
+            except queue.Empty:
+                pass
+            except queue.Full:
+                self.ocr_descartados += 1
+        
+        if self.planificador is not None:
+            self.planificador.notificar()
 
     def _loop_ocr(self):
         """Loop separado para procesamiento OCR"""
@@ -142,125 +769,353 @@ class EscanerCedula:
             try:
                 # Esperar por frame para procesar
                 frame = self.ocr_queue.get(timeout=0.1)
-                self._procesar_frame_ocr(frame)
             except queue.Empty:
                 continue
+            frames = [frame]
+            try:
+                if self.pool_ocr:
+                    # El resultado vuelve en orden por _atender_lecturas
+                    if not self.pool_ocr.enviar(frame, timeout=0.5):
+                        self.ocr_descartados += 1
+                elif self.tamano_lote > 1:
+                    self._procesar_lote_ocr(self._completar_lote(frames))
+                else:
+                    self._procesar_frame_ocr(frame)
             except Exception as e:
-                print(f"[ERROR] Error en loop OCR: {e}")
+                log.error("Error en loop OCR: %s", e)
+            finally:
+                self._ocr_terminado(len(frames))
+
+    def _completar_lote(self, frames):
+        """Agrega frames de la cola hasta llenar el lote o agotar la espera máxima"""
+        limite = time.perf_counter() + self.espera_lote
+        while len(frames) < self.tamano_lote and self.ocr_running:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                frames.append(self.ocr_queue.get(timeout=restante))
+            except queue.Empty:
+                break
+        return frames
+
+    def _loop_preview(self):
+        """Loop persistente que codifica siempre el frame más reciente para la UI"""
+        while self.preview_running:
+            # Respetar los fps de la vista previa: mientras tanto la ranura descarta frames en origen
+            espera = self._proximo_preview - time.monotonic()
+            if espera > 0:
+                time.sleep(min(espera, 0.1))
+                continue
+            
+            # Sin crédito la UI aún no terminó con el frame anterior: no codificar nada
+            if not self.creditos_preview.esperar(timeout=0.1):
+                continue
+            
+            indice = self.preview_slot.tomar(timeout=0.1)
+            if indice is None:
+                self.creditos_preview.confirmar()
+                continue
+            try:
+                self._proximo_preview = time.monotonic() + 1.0 / self.preview_fps
+                if not self._enviar_frame_a_ui(self.anillo.buffer(indice)):
+                    self.creditos_preview.confirmar()
+            finally:
+                self.anillo.liberar(indice)
 
     def _redimensionar_frame_para_ocr(self, frame):
         """Redimensiona el frame para procesamiento OCR más rápido"""
-        height, width = frame.shape[:2]
-        new_width = int(width * self.resize_factor)
-        new_height = int(height * self.resize_factor)
-        return cv2.resize(frame, (new_width, new_height))
+        with self.metricas.medir("redimension"):
+            height, width = frame.shape[:2]
+            new_width = int(width * self.resize_factor)
+            new_height = int(height * self.resize_factor)
+            return cv2.resize(frame, (new_width, new_height))
 
-    def _enviar_frame_a_ui(self):
-        """Convierte el frame actual a base64 y lo envía a la UI - optimizado"""
+    def _enviar_frame_a_ui(self, frame):
+        """Codifica el frame a JPEG y lo envía a la UI - sin pasar por PIL ni RGB"""
         try:
-            if self.frame is None:
-                return
-                
-            # Convertir el frame de OpenCV a formato adecuado para Flet
-            rgb_frame = cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB)
+            if frame is None:
+                return False
             
-            # Redimensionar para transmisión más rápida si es necesario
-            height, width = rgb_frame.shape[:2]
-            if width > 800:
-                scale = 800 / width
-                new_width = 800
-                new_height = int(height * scale)
-                rgb_frame = cv2.resize(rgb_frame, (new_width, new_height))
+            superposicion = self._superposicion_vigente()
             
-            pil_img = Image.fromarray(rgb_frame)
-            
-            # Convertir a JPEG con calidad optimizada
-            buffer = BytesIO()
-            pil_img.save(buffer, format="JPEG", quality=self.jpeg_quality, optimize=True)
-            img_bytes = buffer.getvalue()
+            with self.metricas.medir("codificacion_preview"):
+                # Un solo redimensionado al tamaño de la vista previa; se copia solo si hay que dibujar encima
+                imagen, escala = self.codificador_preview.escalar(frame, copiar=superposicion is not None)
+                if superposicion is not None:
+                    self._componer_superposicion(imagen, escala, superposicion)
+                
+                img_bytes = self.codificador_preview.codificar(imagen)
             
             # Llamar al callback con los bytes de la imagen
-            self.on_frame_update(img_bytes)
+            self.frames_codificados += 1
+            with self.metricas.medir("callback_preview"):
+                self.on_frame_update(img_bytes)
+            return True
         except Exception as e:
-            print(f"[ERROR] Error enviando frame a UI: {e}")
+            log.error("Error enviando frame a UI: %s", e)
+            return False
+
+    def configurar_preview(self, ancho=None, calidad=None, fps=None, creditos=None):
+        """
+        Ajusta el ancho, la calidad JPEG y los fps de la vista previa. Con creditos > 0 solo se
+        envían frames mientras la UI tenga créditos; la UI debe llamar a confirmar_frame().
+        """
+        self.codificador_preview.configurar(ancho=ancho, calidad=calidad)
+        if fps is not None:
+            if fps <= 0:
+                raise ValueError("fps de vista previa debe ser mayor que 0")
+            self.preview_fps = fps
+        if creditos is not None:
+            self.creditos_preview.configurar(creditos)
+
+    def confirmar_frame(self):
+        """La UI avisa que terminó de mostrar un frame de la vista previa"""
+        self.creditos_preview.confirmar()
+
+    def _config_motor(self):
+        """Parámetros para reconstruir el motor OCR dentro de los procesos trabajadores"""
+        return self.motor.configuracion()
 
     def _procesar_frame_ocr(self, frame):
         """Procesa el frame buscando números de cédula - versión optimizada"""
+        inicio = time.perf_counter()
         try:
-            # Preprocesar imagen para mejor OCR
-            frame_procesado = self._preprocesar_para_ocr(frame)
+            lecturas = self.motor.analizar(frame)
+        except Exception as e:
+            self._atender_lecturas(None, str(e))
+            return
+        finally:
+            latencia = time.perf_counter() - inicio
+            self.latencias_ocr.append(latencia)
+            self.tiempo_ocr_total += latencia
+            self.metricas.registrar("ocr", latencia)
+        self._atender_lecturas(lecturas)
+
+    def _procesar_lote_ocr(self, frames):
+        """Analiza varios frames con una sola llamada al reconocedor y atiende cada resultado por separado"""
+        inicio = time.perf_counter()
+        try:
+            resultados = self.motor.analizar_lote(frames)
+        except Exception as e:
+            for _ in frames:
+                self._atender_lecturas(None, str(e))
+            return
+        finally:
+            # Cada frame esperó el lote completo; la ocupación del OCR cuenta el tiempo una sola vez
+            latencia = time.perf_counter() - inicio
+            self.latencias_ocr.append(latencia)
+            self.tiempo_ocr_total += latencia
+            self.metricas.registrar("ocr_lote", latencia)
+        for lecturas in resultados:
+            self._atender_lecturas(lecturas)
+
+    def configurar_lote(self, tamano=None, espera_maxima=None):
+        """
+        Ajusta el tamaño de lote y la espera máxima para completarlo. La cola OCR crece para poder
+        juntar el lote; conviene llamarlo antes de iniciar_escaneo.
+        """
+        if tamano is not None:
+            if tamano < 1:
+                raise ValueError("tamano debe ser al menos 1")
+            self.tamano_lote = tamano
+            if self.ocr_queue.maxsize < tamano:
+                self.ocr_queue = queue.Queue(maxsize=tamano)
+        if espera_maxima is not None:
+            if espera_maxima < 0:
+                raise ValueError("espera_maxima no puede ser negativa")
+            self.espera_lote = espera_maxima
+
+    def medicion_ocr(self):
+        """Devuelve (tiempo OCR acumulado, latencias recientes, trabajadores en paralelo)"""
+        if self.pool_ocr:
+            return self.pool_ocr.tiempo_total, list(self.pool_ocr.latencias), self.pool_ocr.num_procesos
+        return self.tiempo_ocr_total, list(self.latencias_ocr), 1
+
+    def _atender_lecturas(self, lecturas, error=None):
+        """Vota con las lecturas de un frame y notifica la cédula cuando hay consenso"""
+        try:
+            if self.pausado:
+                # Resultado de un frame capturado antes de pausar
+                return
+            
+            self.ocr_procesados += 1
+            
+            if error:
+                log.error("Error en procesamiento OCR: %s", error)
+                self._notificar_fallo()
+                return
             
-            # Ejecutar OCR con configuraciones optimizadas
-            resultados = self.reader.readtext(
-                frame_procesado,
-                width_ths=0.7,
-                height_ths=0.7,
-                paragraph=False,
-                detail=1
-            )
+            if lecturas is None:
+                # No había cédula en el frame
+                self.frames_sin_cedula += 1
+                self._notificar_fallo()
+                return
             
             cedula_encontrada = False
             
-            for bbox, texto, conf in resultados:
+            for bbox, texto, conf in lecturas:
                 texto_limpio = ''.join(filter(str.isdigit, texto))
+                if len(texto_limpio) != 9:
+                    continue
+                
+                # Con el registro cargado, una lectura dudosa cercana a una cédula registrada se corrige
+                ajuste = None
+                if self.indice_cedulas is not None and conf >= self.confianza_minima_registrada:
+                    ajuste = self.indice_cedulas.ajustar(texto_limpio, apoyo=self.consenso.apoyo(texto_limpio))
                 
                 # Verificar si es un número de cédula válido
-                if conf >= 0.25 and len(texto_limpio) == 9:
-                    print(f"[DEBUG] Cédula detectada: '{texto_limpio}' (confianza: {conf:.2f})")
+                if ajuste is not None or conf >= self.confianza_minima:
+                    log.debug("Lectura de cédula: '%s' (confianza: %.2f)", texto_limpio, conf)
+                    if ajuste is not None and ajuste[0] != texto_limpio:
+                        log.debug("Corregida a la cédula registrada '%s' (distancia: %s)", ajuste[0], ajuste[1])
+                        self.correcciones += 1
+                        texto_limpio = ajuste[0]
                     
                     # Escalar bbox de vuelta al tamaño original
                     bbox_escalado = self._escalar_bbox(bbox, 1/self.resize_factor)
                     self._dibujar_deteccion(bbox_escalado, texto_limpio)
                     
-                    # Notificar cédula encontrada
-                    threading.Thread(
-                        target=self.on_cedula_found,
-                        args=(texto_limpio,),
-                        daemon=True
-                    ).start()
+                    if (ajuste is not None and ajuste[1] == 0 and conf >= self.confianza_exacta_registrada
+                            and self._notificar_cedula(texto_limpio)):
+                        # Coincide tal cual con el registro: no hace falta esperar más frames
+                        self.consenso.reiniciar()
+                        log.debug("Cédula registrada leída tal cual: '%s'", texto_limpio)
+                        cedula_encontrada = True
+                        break
+                    
+                    # Votar con las lecturas recientes antes de notificar
+                    resultado = self.consenso.agregar(texto_limpio, conf)
+                    if resultado:
+                        cedula, acuerdo = resultado
+                        if self._notificar_cedula(cedula):
+                            log.debug("Cédula por consenso: '%s' (acuerdo: %.2f)", cedula, acuerdo)
                     cedula_encontrada = True
                     break
             
             if not cedula_encontrada:
-                self.on_scan_failed()
+                self._notificar_fallo()
                 
         except Exception as e:
-            print(f"[ERROR] Error en procesamiento OCR: {e}")
-            self.on_scan_failed()
+            log.error("Error en procesamiento OCR: %s", e)
+            self._notificar_fallo()
 
-    def _preprocesar_para_ocr(self, frame):
-        """Preprocesa la imagen para mejorar el OCR"""
-        # Convertir a escala de grises
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    def _notificar_cedula(self, cedula):
+        """Marca la lectura como resuelta y notifica la cédula una sola vez; devuelve False si ya estaba resuelta"""
+        with self._lock_notificacion:
+            # Con el despachador detenido nadie recibiría la cédula: la lectura no se da por resuelta
+            if self.consenso_alcanzado or not self.despachador.activo():
+                return False
+            self.consenso_alcanzado = True
+        self.detecciones += 1
         
-        # Aplicar filtro bilateral para reducir ruido manteniendo bordes
-        denoised = cv2.bilateralFilter(gray, 9, 75, 75)
-        
-        # Ajustar contraste usando CLAHE
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(denoised)
+        # Notificar cédula encontrada en el hilo de eventos, detrás de los eventos previos
+        if not self.despachador.publicar("cedula", self.on_cedula_found, cedula):
+            # Sin el evento nadie pausaría ni reanudaría: volver a habilitar el OCR
+            with self._lock_notificacion:
+                self.consenso_alcanzado = False
+            self.detecciones -= 1
+            return False
+        return True
+
+    def _notificar_fallo(self):
+        # Llega un fallo por frame sin cédula: si la cola está llena se descarta
+        self.despachador.publicar("fallo", self.on_scan_failed, descartable=True)
+
+    def activar_qr(self, resolver_hash: Callable[[str], str], intervalo=0.1):
+        """
+        Activa la vía rápida por QR: cada intervalo se busca un código con el codigo_hash del
+        estudiante y, si resolver_hash lo reconoce, se notifica la cédula sin pasar por el OCR.
+        """
+        if intervalo <= 0:
+            raise ValueError("intervalo debe ser mayor que 0")
+        self.lector_qr = LectorQR()
+        self.resolver_hash = resolver_hash
+        self.intervalo_qr = intervalo
+
+    def desactivar_qr(self):
+        self.lector_qr = None
+        self.resolver_hash = None
+
+    def _intentar_qr(self, frame):
+        """Busca un QR en el frame completo; devuelve True si resolvió una cédula"""
+        self.qr_intentos += 1
+        try:
+            lectura = self.lector_qr.leer(frame)
+            if lectura is None:
+                return False
+            codigo_hash, esquinas = lectura
+            cedula = self.resolver_hash(codigo_hash)
+            if not cedula:
+                # Código de otra instalación o de un registro eliminado: seguir con el OCR
+                return False
+        except Exception as e:
+            log.error("Error leyendo QR: %s", e)
+            return False
         
-        return enhanced
+        self._dibujar_deteccion(esquinas, cedula)
+        if self._notificar_cedula(cedula):
+            self.qr_detecciones += 1
+            log.debug("Cédula por QR: '%s'", cedula)
+        return True
 
     def _escalar_bbox(self, bbox, factor):
         """Escala un bounding box por un factor dado"""
         return [[int(punto[0] * factor), int(punto[1] * factor)] for punto in bbox]
 
     def _dibujar_deteccion(self, bbox, texto):
-        """Dibuja la detección en el frame principal"""
-        if self.frame is None:
-            return
-            
+        """Registra la detección para que la vista previa la dibuje durante un momento"""
+        self.superposicion = (bbox, texto, time.time())
+
+    def _superposicion_vigente(self):
+        """Devuelve (bbox, texto) de la última detección si aún debe mostrarse"""
+        superposicion = self.superposicion
+        if superposicion is None:
+            return None
+        bbox, texto, instante = superposicion
+        if time.time() - instante > self.duracion_superposicion:
+            return None
+        return bbox, texto
+
+    def _componer_superposicion(self, imagen, escala, superposicion):
+        """Dibuja la detección sobre una imagen ya escalada para la vista previa"""
+        bbox, texto = superposicion
         try:
-            puntos = [tuple(punto) for punto in bbox]
-            cv2.polylines(self.frame, [np.array(puntos)], isClosed=True, color=(0, 255, 0), thickness=2)
-            cv2.putText(self.frame, texto, puntos[0], cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            puntos = [(int(punto[0] * escala), int(punto[1] * escala)) for punto in bbox]
+            cv2.polylines(imagen, [np.array(puntos)], isClosed=True, color=(0, 255, 0), thickness=2)
+            cv2.putText(imagen, texto, puntos[0], cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
         except Exception as e:
-            print(f"[ERROR] Error dibujando detección: {e}")
-
-    def ajustar_parametros_performance(self, target_fps=51, ocr_interval=0, resize_factor=0):
-        """Permite ajustar parámetros de performance en tiempo real"""
-        self.target_fps = target_fps
-        self.frame_delay = 1.0 / target_fps
-        self.ocr_interval = ocr_interval
-        self.resize_factor = resize_factor
+            log.error("Error dibujando detección: %s", e)
+
+    def usar_registro(self, indice_cedulas, confianza_minima=None, confianza_exacta=None):
+        """Corrige las lecturas hacia las cédulas de indice_cedulas (None vuelve a leer sin registro)"""
+        self.indice_cedulas = indice_cedulas
+        if confianza_minima is not None:
+            self.confianza_minima_registrada = confianza_minima
+        if confianza_exacta is not None:
+            self.confianza_exacta_registrada = confianza_exacta
+
+    def configurar_consenso(self, ventana=None, umbral_acuerdo=None, minimo_lecturas=None, confianza_inmediata=None):
+        """Ajusta la ventana y el umbral de acuerdo de la votación entre frames"""
+        self.consenso.configurar(
+            ventana=ventana,
+            umbral_acuerdo=umbral_acuerdo,
+            minimo_lecturas=minimo_lecturas,
+            confianza_inmediata=confianza_inmediata
+        )
+
+    def ajustar_parametros_performance(self, target_fps=None, ocr_interval=None, resize_factor=None, frame_skip_rate=None):
+        """Permite ajustar parámetros de performance en tiempo real (None conserva el valor actual)"""
+        if target_fps is not None:
+            if target_fps <= 0:
+                raise ValueError("target_fps debe ser mayor que 0")
+            self.target_fps = target_fps
+            self.frame_delay = 1.0 / target_fps
+        if ocr_interval is not None:
+            self.ocr_interval = max(0.0, ocr_interval)
+        if resize_factor is not None:
+            if not 0 < resize_factor <= 1:
+                raise ValueError("resize_factor debe estar entre 0 y 1")
+            self.resize_factor = resize_factor
+        if frame_skip_rate is not None:
+            self.frame_skip_rate = max(1, int(frame_skip_rate))
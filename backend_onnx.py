@@ -0,0 +1,136 @@
+"""
+Backend ONNX Runtime para EasyOCR: exporta el detector CRAFT y el reconocedor a ONNX (opcionalmente
+con cuantización dinámica int8) y reemplaza los modelos de PyTorch del Reader por sesiones de
+onnxruntime. El pre y posprocesamiento siguen siendo los de EasyOCR, así que las lecturas son
+equivalentes; solo cambia dónde corre la inferencia.
+
+Requiere: pip install onnx onnxruntime
+"""
+import os
+import numpy as np
+import torch
+from bitacora import obtener_logger
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+log = obtener_logger("onnx")
+
+
+class _SesionDetector:
+    """Se comporta como el módulo CRAFT que EasyOCR invoca: net(x) -> (y, feature)"""
+
+    def __init__(self, sesion):
+        self.sesion = sesion
+        self.entrada = sesion.get_inputs()[0].name
+
+    def __call__(self, x):
+        y, feature = self.sesion.run(None, {self.entrada: x.detach().cpu().numpy().astype(np.float32)})
+        return torch.from_numpy(y), torch.from_numpy(feature)
+
+    def eval(self):
+        return self
+
+
+class _SesionReconocedor:
+    """Se comporta como el modelo de reconocimiento de EasyOCR: model(image, text) -> preds"""
+
+    def __init__(self, sesion):
+        self.sesion = sesion
+        # El exportador suele eliminar la entrada de texto porque el modelo CTC no la usa
+        self.entradas = [entrada.name for entrada in sesion.get_inputs()]
+
+    def __call__(self, imagen, texto=None):
+        valores = {"imagen": imagen.detach().cpu().numpy().astype(np.float32)}
+        if "texto" in self.entradas and texto is not None:
+            valores["texto"] = texto.detach().cpu().numpy()
+        (preds,) = self.sesion.run(None, {nombre: valores[nombre] for nombre in self.entradas})
+        return torch.from_numpy(preds)
+
+    def eval(self):
+        return self
+
+
+def _modulo(modelo):
+    """Quita el envoltorio DataParallel que EasyOCR agrega en GPU"""
+    return modelo.module if hasattr(modelo, "module") else modelo
+
+
+def rutas_modelos(directorio, cuantizar=True):
+    """Devuelve las rutas (detector, reconocedor) dentro del directorio de modelos ONNX"""
+    sufijo = "_int8" if cuantizar else ""
+    return (os.path.join(directorio, "detector.onnx"),
+            os.path.join(directorio, f"reconocedor{sufijo}.onnx"))
+
+
+def exportar_onnx(reader, directorio, cuantizar=True, cuantizar_detector=False):
+    """
+    Exporta los modelos del Reader a ONNX. La cuantización dinámica int8 se aplica por defecto
+    solo al reconocedor (LSTM y capas lineales); en el detector, casi todo convoluciones, suele
+    ganar poco en CPU y se deja opcional.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    ruta_detector, ruta_reconocedor = rutas_modelos(directorio, cuantizar)
+
+    detector = _modulo(reader.detector).cpu().eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            detector, torch.randn(1, 3, 640, 640), ruta_detector,
+            input_names=["imagen"], output_names=["y", "feature"],
+            dynamic_axes={"imagen": {0: "lote", 2: "alto", 3: "ancho"},
+                          "y": {0: "lote", 1: "alto", 2: "ancho"},
+                          "feature": {0: "lote", 2: "alto", 3: "ancho"}},
+            opset_version=13,
+        )
+
+    reconocedor = _modulo(reader.recognizer).cpu().eval()
+    if any("quantized" in type(capa).__module__ for capa in reconocedor.modules()):
+        raise Exception("El reconocedor ya está cuantizado por torch y no se puede exportar; "
+                        "cree el Reader con easyocr.Reader(..., quantize=False)")
+    ruta_reconocedor_fp32 = os.path.join(directorio, "reconocedor.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            reconocedor, (torch.randn(1, 1, 64, 256), torch.zeros(1, 26, dtype=torch.long)), ruta_reconocedor_fp32,
+            input_names=["imagen", "texto"], output_names=["preds"],
+            dynamic_axes={"imagen": {0: "lote", 3: "ancho"}, "preds": {0: "lote", 1: "pasos"}},
+            opset_version=13,
+        )
+
+    if cuantizar:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(ruta_reconocedor_fp32, ruta_reconocedor, weight_type=QuantType.QInt8)
+        if cuantizar_detector:
+            ruta_detector_int8 = os.path.join(directorio, "detector_int8.onnx")
+            quantize_dynamic(ruta_detector, ruta_detector_int8, weight_type=QuantType.QInt8)
+            os.replace(ruta_detector_int8, ruta_detector)
+    return ruta_detector, ruta_reconocedor
+
+
+def crear_sesion(ruta, hilos=None):
+    """Sesión de onnxruntime en CPU con la cantidad de hilos indicada (None deja que decida)"""
+    if ort is None:
+        raise Exception("onnxruntime no está instalado (pip install onnxruntime)")
+    opciones = ort.SessionOptions()
+    if hilos:
+        opciones.intra_op_num_threads = hilos
+        opciones.inter_op_num_threads = 1
+    opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(ruta, sess_options=opciones, providers=["CPUExecutionProvider"])
+
+
+def instalar_onnx(reader, directorio, cuantizar=True, hilos=None):
+    """
+    Reemplaza el detector y el reconocedor del Reader por sesiones ONNX, exportándolos la primera
+    vez. Los modelos de PyTorch se sueltan para liberar su memoria.
+    """
+    ruta_detector, ruta_reconocedor = rutas_modelos(directorio, cuantizar)
+    if not (os.path.exists(ruta_detector) and os.path.exists(ruta_reconocedor)):
+        log.info("Exportando modelos de EasyOCR a ONNX en '%s'...", directorio)
+        exportar_onnx(reader, directorio, cuantizar)
+
+    reader.detector = _SesionDetector(crear_sesion(ruta_detector, hilos))
+    reader.recognizer = _SesionReconocedor(crear_sesion(ruta_reconocedor, hilos))
+    reader.device = "cpu"
+    return reader
@@ -0,0 +1,214 @@
+"""
+Benchmark de punta a punta del escáner sin cámara ni persona sosteniendo la cédula.
+
+Ejemplos:
+    python benchmark_escaner.py --duracion 20
+    python benchmark_escaner.py --lector-simulado --latencia-ocr 0.15 --continuo
+    python benchmark_escaner.py --video grabacion.mp4 --tiempo-real --salida bench_output.txt
+    python benchmark_escaner.py --imagenes capturas/ --perfil rapido
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import cv2
+import numpy as np
+from IR_scanner import EscanerCedula
+from fuentes_video import FuenteSintetica, FuenteVideo, FuenteImagenes
+from procesamiento import PERFILES_PREPROCESAMIENTO
+
+
+class LectorSimulado:
+    """Sustituto de easyocr.Reader con latencia configurable que siempre 'lee' la cédula indicada"""
+
+    def __init__(self, cedula="123456789", latencia=0.2, confianza=0.8, tasa_error=0.0):
+        self.cedula = cedula
+        self.latencia = latencia  # Segundos por llamada de detección y por llamada de reconocimiento
+        self.confianza = confianza
+        self.tasa_error = tasa_error  # Probabilidad de cambiar un dígito al azar en cada lectura
+
+    def _caja(self, imagen):
+        height, width = imagen.shape[:2]
+        return [int(width * 0.3), int(width * 0.8), int(height * 0.6), int(height * 0.7)]
+
+    def _texto(self):
+        if random.random() >= self.tasa_error:
+            return self.cedula
+        posicion = random.randrange(len(self.cedula))
+        return self.cedula[:posicion] + str(random.randrange(10)) + self.cedula[posicion + 1:]
+
+    def _resultado(self, caja):
+        x_min, x_max, y_min, y_max = caja
+        bbox = [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+        return bbox, self._texto(), self.confianza
+
+    def detect(self, imagen, **kwargs):
+        time.sleep(self.latencia)
+        return [[self._caja(imagen)]], [[]]
+
+    def recognize(self, imagen, horizontal_list=None, free_list=None, **kwargs):
+        time.sleep(self.latencia)
+        return [self._resultado(caja) for caja in (horizontal_list or [])]
+
+    def reconocer_franjas(self, franjas):
+        # Una sola pasada por lote, como get_text con batch_size igual a la cantidad de franjas
+        time.sleep(self.latencia)
+        return [(self._texto(), self.confianza) for _ in franjas]
+
+    def readtext(self, imagen, **kwargs):
+        time.sleep(self.latencia * 2)
+        return [self._resultado(self._caja(imagen))]
+
+
+def generar_frames_sinteticos(cedula, cantidad=60, ancho=1280, alto=720):
+    """Genera frames con una tarjeta blanca que se desplaza levemente sobre un fondo oscuro"""
+    frames = []
+    ancho_tarjeta, alto_tarjeta = 640, 404
+    for i in range(cantidad):
+        frame = np.full((alto, ancho, 3), 40, dtype=np.uint8)
+        desplazamiento = int(20 * np.sin(2 * np.pi * i / cantidad))
+        x = (ancho - ancho_tarjeta) // 2 + desplazamiento
+        y = (alto - alto_tarjeta) // 2
+        cv2.rectangle(frame, (x, y), (x + ancho_tarjeta, y + alto_tarjeta), (235, 235, 235), -1)
+        cv2.putText(frame, cedula, (x + 200, y + 270), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (20, 20, 20), 3)
+        frames.append(frame)
+    return frames
+
+
+def crear_fuente(args):
+    """Construye la fuente de frames según los argumentos"""
+    if args.video:
+        return FuenteVideo(args.video, tiempo_real=args.tiempo_real, repetir=True)
+    if args.imagenes:
+        return FuenteImagenes(args.imagenes, fps=args.fps, tiempo_real=args.tiempo_real)
+    return FuenteSintetica(generar_frames_sinteticos(args.cedula), fps=args.fps, tiempo_real=args.tiempo_real)
+
+
+def ejecutar_benchmark(args):
+    """Corre el escáner durante la duración indicada y devuelve las métricas en un diccionario"""
+    detecciones = []
+    inicio_ciclo = [0.0]
+    terminado = threading.Event()
+
+    def on_cedula_found(cedula):
+        ahora = time.perf_counter()
+        detecciones.append({"cedula": cedula, "segundos": ahora - inicio_ciclo[0]})
+        if args.continuo:
+            inicio_ciclo[0] = time.perf_counter()
+            escaner.reanudar()
+        else:
+            terminado.set()
+
+    escaner = EscanerCedula(
+        on_cedula_found=on_cedula_found,
+        on_scan_failed=lambda: None,
+        on_frame_update=lambda img_bytes: None,
+        fuente=crear_fuente(args)
+    )
+    escaner.motor.localizar_cedula = not args.sin_localizar
+    escaner.motor.modo = args.modo
+    escaner.motor.usar_perfil(args.perfil)
+    escaner.motor.ruta_reconocedor = args.reconocedor
+    escaner.motor.respaldo_easyocr = not args.sin_easyocr
+    escaner.procesos_ocr = args.procesos
+    escaner.control_adaptativo = not args.sin_control
+    escaner.configurar_lote(tamano=args.lote, espera_maxima=args.espera_lote)
+    if args.target_fps:
+        escaner.ajustar_parametros_performance(target_fps=args.target_fps)
+    if args.lector_simulado:
+        escaner.motor.reader = LectorSimulado(args.cedula, args.latencia_ocr, tasa_error=args.tasa_error)
+
+    # La carga del modelo no cuenta en las métricas
+    escaner.inicializar()
+
+    inicio = time.perf_counter()
+    inicio_ciclo[0] = inicio
+    escaner.iniciar_escaneo()
+    terminado.wait(args.duracion)
+    duracion = time.perf_counter() - inicio
+    escaner.cerrar()
+
+    preview = escaner.obtener_estadisticas_preview()
+    estadisticas = escaner.obtener_estadisticas()
+    tiempos = [d["segundos"] for d in detecciones]
+    return {
+        "duracion_s": round(duracion, 3),
+        "frames_capturados": escaner.frames_capturados,
+        "fps_captura": round(escaner.frames_capturados / duracion, 2),
+        # Con una fuente sin ritmo propio la captura no duerme: fps_captura mide el pipeline
+        "captura_limitada": escaner.fuente.marca_ritmo(),
+        "preview_codificados": preview["codificados"],
+        "preview_descartados": preview["descartados"],
+        "fps_preview": round(preview["codificados"] / duracion, 2),
+        "ocr_encolados": escaner.ocr_encolados,
+        "ocr_descartados": escaner.ocr_descartados,
+        "ocr_procesados": escaner.ocr_procesados,
+        "ocr_por_segundo": round(escaner.ocr_procesados / duracion, 2),
+        "frames_sin_cedula": escaner.frames_sin_cedula,
+        "detecciones": len(detecciones),
+        "tiempo_primera_deteccion_s": round(tiempos[0], 3) if tiempos else None,
+        "tiempo_deteccion_promedio_s": round(sum(tiempos) / len(tiempos), 3) if tiempos else None,
+        "cedulas_detectadas": sorted(set(d["cedula"] for d in detecciones)),
+        # Con --procesos el preprocesamiento ocurre en los trabajadores y aquí no hay estadísticas
+        "perfiles": escaner.motor.estadisticas_perfiles(),
+        "lecturas_por_deteccion": estadisticas["contadores"]["lecturas_por_deteccion"],
+        "etapas": estadisticas["etapas"],
+        "eventos": estadisticas["eventos"],
+        # Píxeles por frame que llegan al OCR antes (frame reducido) y después de recortar la cédula
+        "pixeles_ocr": {
+            "frame_promedio": escaner.motor.pixeles_frame // escaner.motor.recortes if escaner.motor.recortes else None,
+            "recorte_promedio": escaner.motor.pixeles_recorte // escaner.motor.recortes if escaner.motor.recortes else None,
+            "reduccion": round(escaner.motor.pixeles_frame / escaner.motor.pixeles_recorte, 2) if escaner.motor.pixeles_recorte else None,
+        },
+        "lecturas_reconocedor": escaner.motor.lecturas_reconocedor,
+        "lecturas_easyocr": escaner.motor.lecturas_easyocr,
+        "parametros_finales": {
+            "ocr_interval": escaner.ocr_interval,
+            "resize_factor": escaner.resize_factor,
+            "frame_skip_rate": escaner.frame_skip_rate,
+            "target_fps": escaner.target_fps,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de EscanerCedula")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos máximos de ejecución")
+    parser.add_argument("--video", help="Archivo de video a usar como fuente")
+    parser.add_argument("--imagenes", help="Carpeta de imágenes a usar como fuente")
+    parser.add_argument("--fps", type=float, default=30, help="FPS de las fuentes sintética e imágenes")
+    parser.add_argument("--tiempo-real", action="store_true", help="Respetar el ritmo de la fuente en lugar de ir a máxima velocidad")
+    parser.add_argument("--cedula", default="123456789", help="Cédula dibujada en los frames sintéticos y leída por el lector simulado")
+    parser.add_argument("--lector-simulado", action="store_true", help="Reemplazar EasyOCR por un lector con latencia fija")
+    parser.add_argument("--latencia-ocr", type=float, default=0.2, help="Latencia por llamada del lector simulado")
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Probabilidad de que el lector simulado cambie un dígito")
+    parser.add_argument("--modo", choices=["digitos", "completo"], default="digitos", help="Modo del motor OCR")
+    parser.add_argument("--perfil", choices=sorted(PERFILES_PREPROCESAMIENTO), default="calidad", help="Perfil de preprocesamiento previo al OCR")
+    parser.add_argument("--reconocedor", help="Muestras del reconocedor de dígitos (.npz) a probar antes de EasyOCR")
+    parser.add_argument("--sin-easyocr", action="store_true", help="Usar solo el reconocedor de dígitos, sin EasyOCR de respaldo")
+    parser.add_argument("--sin-localizar", action="store_true", help="Pasar el frame completo al OCR sin recortar la cédula")
+    parser.add_argument("--procesos", type=int, default=0, help="Procesos OCR (no compatible con el lector simulado)")
+    parser.add_argument("--lote", type=int, default=1, help="Frames por llamada al reconocedor (1 = frame a frame)")
+    parser.add_argument("--espera-lote", type=float, default=0.05, help="Segundos máximos esperando completar un lote")
+    parser.add_argument("--target-fps", type=float, help="FPS máximos del escáner con fuentes que marcan el ritmo (video, --tiempo-real); sin él, 30")
+    parser.add_argument("--sin-control", action="store_true", help="Desactivar el control adaptativo de parámetros")
+    parser.add_argument("--continuo", action="store_true", help="Reanudar tras cada detección para medir detecciones por minuto")
+    parser.add_argument("--salida", help="Archivo donde guardar el resultado JSON")
+    args = parser.parse_args()
+
+    if args.sin_easyocr and not args.reconocedor:
+        parser.error("--sin-easyocr requiere --reconocedor")
+    if args.lector_simulado and args.procesos:
+        parser.error("--lector-simulado solo funciona con el OCR en el mismo proceso")
+
+    resultado = ejecutar_benchmark(args)
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compara la latencia y la exactitud del OCR con PyTorch frente a ONNX Runtime (fp32 e int8) sobre
+imágenes etiquetadas (el nombre de cada imagen empieza con la cédula que contiene).
+
+Ejemplos:
+    python benchmark_onnx.py --imagenes capturas/
+    python benchmark_onnx.py --imagenes capturas/ --backends onnx-int8 --hilos 2 --salida onnx.txt
+
+La memoria máxima es la del proceso completo; para compararla correr un backend por invocación.
+"""
+import argparse
+import json
+import os
+import resource
+import time
+import cv2
+import numpy as np
+from motor_ocr import MotorOCR
+
+BACKENDS = {
+    "torch": {"backend": "torch"},
+    "onnx-fp32": {"backend": "onnx", "cuantizar_onnx": False},
+    "onnx-int8": {"backend": "onnx", "cuantizar_onnx": True},
+}
+
+
+def cargar_imagenes(directorio, longitud=9):
+    """Devuelve [(cedula, imagen)] de las imágenes cuyo nombre empieza con la cédula"""
+    imagenes = []
+    for nombre in sorted(os.listdir(directorio)):
+        cedula = ''.join(c for c in nombre[:longitud] if c.isdigit())
+        if len(cedula) != longitud:
+            continue
+        imagen = cv2.imread(os.path.join(directorio, nombre))
+        if imagen is not None:
+            imagenes.append((cedula, imagen))
+    return imagenes
+
+
+def medir_backend(nombre, imagenes, args):
+    """Carga el motor con el backend indicado y mide cada imagen; devuelve las métricas"""
+    motor = MotorOCR(
+        gpu=False,
+        modo=args.modo,
+        localizar_cedula=not args.sin_localizar,
+        directorio_onnx=args.directorio_onnx,
+        hilos_onnx=args.hilos,
+        **BACKENDS[nombre]
+    )
+    inicio = time.perf_counter()
+    motor.cargar()
+    tiempo_carga = time.perf_counter() - inicio
+
+    # Calentamiento: la primera inferencia incluye reservas de memoria y optimización del grafo
+    motor.analizar(imagenes[0][1])
+
+    latencias = []
+    aciertos = 0
+    for _ in range(args.repeticiones):
+        for cedula, imagen in imagenes:
+            inicio = time.perf_counter()
+            lecturas = motor.analizar(imagen)
+            latencias.append(time.perf_counter() - inicio)
+            textos = {''.join(filter(str.isdigit, texto)) for _, texto, _ in (lecturas or [])}
+            if cedula in textos:
+                aciertos += 1
+
+    latencias_ms = np.array(latencias) * 1000
+    return {
+        "carga_s": round(tiempo_carga, 2),
+        "frames": len(latencias),
+        "latencia_promedio_ms": round(float(latencias_ms.mean()), 1),
+        "latencia_p50_ms": round(float(np.percentile(latencias_ms, 50)), 1),
+        "latencia_p95_ms": round(float(np.percentile(latencias_ms, 95)), 1),
+        "exactitud": round(aciertos / len(latencias), 3),
+        # ru_maxrss está en KB en Linux
+        "memoria_max_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los backends de inferencia del OCR")
+    parser.add_argument("--imagenes", required=True, help="Carpeta de imágenes cuyo nombre empieza con la cédula")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS), help="Backends a comparar")
+    parser.add_argument("--hilos", type=int, help="Hilos de onnxruntime (por defecto los decide onnxruntime)")
+    parser.add_argument("--directorio-onnx", default="modelos_onnx", help="Dónde exportar o buscar los modelos ONNX")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Pasadas sobre el conjunto de imágenes")
+    parser.add_argument("--modo", choices=["digitos", "completo"], default="digitos", help="Modo del motor OCR")
+    parser.add_argument("--sin-localizar", action="store_true", help="Pasar la imagen completa al OCR sin recortar la cédula")
+    parser.add_argument("--salida", help="Archivo donde guardar el resultado JSON")
+    args = parser.parse_args()
+
+    imagenes = cargar_imagenes(args.imagenes)
+    if not imagenes:
+        parser.error("No hay imágenes etiquetadas en la carpeta indicada")
+
+    resultado = {nombre: medir_backend(nombre, imagenes, args) for nombre in args.backends}
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Bitácora del sistema: los módulos escriben en una cola y un único hilo de fondo vuelca los
+mensajes a la consola (y opcionalmente a un archivo), así la captura, el OCR y la base de datos
+nunca esperan a que la consola termine de escribir.
+
+Uso:
+    from bitacora import obtener_logger
+    log = obtener_logger("escaner")
+    log.debug("Lectura de cédula: '%s' (confianza: %.2f)", texto, conf)
+
+Los argumentos se pasan aparte (no con f-strings) para que un nivel desactivado no formatee nada.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+RAIZ = "escaner"  # Todos los loggers de la aplicación cuelgan de este
+
+_lock = threading.Lock()
+_oyente = None
+_manejador_cola = None
+_configurada = False
+_modulos = set()  # Loggers con nivel propio puesto por una configuración anterior
+
+
+class FiltroRepeticiones(logging.Filter):
+    """
+    Deja pasar un mismo mensaje (logger, nivel y texto ya formateado) como mucho una vez por
+    intervalo; la siguiente vez que sale indica cuántas repeticiones se omitieron. Mensajes de
+    una misma plantilla con otros argumentos no son repeticiones.
+    """
+
+    def __init__(self, intervalo=5.0):
+        super().__init__()
+        self.intervalo = intervalo
+        self._ultimos = {}  # clave -> [instante de la última emisión, repeticiones omitidas]
+        self._lock = threading.Lock()
+
+    def filter(self, registro):
+        if self.intervalo <= 0:
+            return True
+        clave = (registro.name, registro.levelno, registro.getMessage())
+        ahora = time.monotonic()
+        with self._lock:
+            estado = self._ultimos.get(clave)
+            if estado is not None and ahora - estado[0] < self.intervalo:
+                estado[1] += 1
+                return False
+            omitidas = estado[1] if estado is not None else 0
+            self._ultimos[clave] = [ahora, 0]
+            if len(self._ultimos) > 1000:
+                # Plantillas viejas que ya no se repiten
+                self._ultimos = {c: e for c, e in self._ultimos.items() if ahora - e[0] < self.intervalo}
+        if omitidas:
+            registro.msg = f"{clave[2]} (repetido {omitidas} {'vez' if omitidas == 1 else 'veces'})"
+            registro.args = None
+        return True
+
+
+def configurar_bitacora(nivel="INFO", modulos=None, archivo=None, intervalo_repeticion=5.0, habilitada=True):
+    """
+    (Re)configura la bitácora.
+      nivel: nivel general ("DEBUG", "INFO", "WARNING", "ERROR").
+      modulos: niveles por módulo, p. ej. {"escaner": "DEBUG", "gestor": False}; False lo apaga.
+      archivo: ruta opcional donde guardar también los mensajes.
+      intervalo_repeticion: segundos durante los que se omite un mensaje repetido (0 no limita).
+      habilitada: False descarta todo sin formatear ni encolar nada.
+    """
+    global _oyente, _manejador_cola, _configurada, _modulos
+    with _lock:
+        _configurada = True
+        raiz = logging.getLogger(RAIZ)
+        raiz.propagate = False
+
+        if _oyente is not None:
+            _oyente.stop()
+            raiz.removeHandler(_manejador_cola)
+            _oyente = None
+            _manejador_cola = None
+
+        # Un nivel por módulo de una llamada anterior tendría prioridad sobre el nivel general
+        for nombre in _modulos:
+            logger = logging.getLogger(nombre)
+            logger.disabled = False
+            logger.setLevel(logging.NOTSET)
+        _modulos = set()
+
+        if not habilitada:
+            # Por encima de CRITICAL: isEnabledFor corta antes de crear el registro
+            raiz.setLevel(logging.CRITICAL + 1)
+            return
+        raiz.setLevel(nivel)
+
+        for modulo, nivel_modulo in (modulos or {}).items():
+            logger = logging.getLogger(f"{RAIZ}.{modulo}")
+            _modulos.add(logger.name)
+            logger.disabled = nivel_modulo is False
+            logger.setLevel(logging.NOTSET if nivel_modulo in (False, None) else nivel_modulo)
+
+        formato = logging.Formatter("[%(levelname)s] %(message)s")
+        destinos = [logging.StreamHandler(sys.stdout)]
+        if archivo:
+            destinos.append(logging.FileHandler(archivo, encoding="utf-8"))
+        for destino in destinos:
+            destino.setFormatter(formato)
+
+        _manejador_cola = logging.handlers.QueueHandler(queue.SimpleQueue())
+        _manejador_cola.addFilter(FiltroRepeticiones(intervalo_repeticion))
+        raiz.addHandler(_manejador_cola)
+        _oyente = logging.handlers.QueueListener(_manejador_cola.queue, *destinos, respect_handler_level=True)
+        _oyente.start()
+
+
+def detener_bitacora():
+    """Vuelca lo pendiente y detiene el hilo de escritura"""
+    global _oyente
+    with _lock:
+        if _oyente is not None:
+            _oyente.stop()
+            _oyente = None
+
+
+def obtener_logger(modulo):
+    """Logger del módulo indicado; la primera llamada deja la bitácora con la configuración por defecto"""
+    if not _configurada:
+        configurar_bitacora()
+    return logging.getLogger(f"{RAIZ}.{modulo}")
+
+
+atexit.register(detener_bitacora)
@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheDecisiones:
+    """
+    Recuerda por unos segundos la decisión tomada para cada cédula (registro encontrado, si ya
+    pasó hoy) para que las lecturas repetidas de una tarjeta que sigue frente a la cámara no
+    vuelvan a consultar SQLite ni a escribir otra fila en el historial.
+    """
+
+    def __init__(self, ttl=20.0, max_entradas=256):
+        self.ttl = ttl  # Segundos que una decisión se considera vigente
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # cedula -> (instante, decision)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def configurar(self, ttl=None):
+        if ttl is not None:
+            if ttl < 0:
+                raise ValueError("ttl no puede ser negativo")
+            self.ttl = ttl
+
+    def obtener(self, cedula):
+        """Devuelve la decisión vigente de la cédula o None si no hay o ya expiró"""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(cedula)
+            if entrada is None or ahora - entrada[0] > self.ttl:
+                self._entradas.pop(cedula, None)
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, cedula, decision):
+        """Registra la decisión de la cédula; el plazo cuenta desde ahora"""
+        ahora = time.monotonic()
+        with self._lock:
+            self._entradas.pop(cedula, None)
+            self._entradas[cedula] = (ahora, decision)
+            # Las más antiguas van primero: quitar las expiradas y, si sigue lleno, las más viejas
+            while self._entradas:
+                instante, _ = next(iter(self._entradas.values()))
+                if ahora - instante <= self.ttl and len(self._entradas) <= self.max_entradas:
+                    break
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, cedula=None):
+        """Olvida la decisión de una cédula (p. ej. tras editar su registro) o todas si no se indica"""
+        with self._lock:
+            if cedula is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(cedula, None)
@@ -0,0 +1,86 @@
+import time
+from collections import deque
+
+
+class VotadorConsenso:
+    """Combina las lecturas OCR de los últimos frames con votos por dígito ponderados por confianza"""
+
+    def __init__(self, ventana=5, umbral_acuerdo=0.6, minimo_lecturas=2,
+                 confianza_inmediata=0.9, longitud=9, max_edad=2.0):
+        self.ventana = ventana  # Cantidad de lecturas recientes que participan en la votación
+        self.umbral_acuerdo = umbral_acuerdo  # Fracción del peso que debe tener el dígito ganador en cada posición
+        self.minimo_lecturas = minimo_lecturas
+        self.confianza_inmediata = confianza_inmediata  # Una sola lectura así de segura basta
+        self.longitud = longitud
+        self.max_edad = max_edad  # Segundos antes de que una lectura deje de votar
+        self.lecturas = deque(maxlen=ventana)
+
+    def configurar(self, ventana=None, umbral_acuerdo=None, minimo_lecturas=None, confianza_inmediata=None):
+        """Ajusta los parámetros de la votación conservando las lecturas que aún caben en la ventana"""
+        if ventana is not None and ventana != self.ventana:
+            self.ventana = ventana
+            self.lecturas = deque(self.lecturas, maxlen=ventana)
+        if umbral_acuerdo is not None:
+            self.umbral_acuerdo = umbral_acuerdo
+        if minimo_lecturas is not None:
+            self.minimo_lecturas = minimo_lecturas
+        if confianza_inmediata is not None:
+            self.confianza_inmediata = confianza_inmediata
+
+    def reiniciar(self):
+        """Olvida todas las lecturas acumuladas"""
+        self.lecturas.clear()
+
+    def agregar(self, texto, confianza, instante=None):
+        """Registra una lectura de la longitud esperada y devuelve (cédula, confianza) si hay consenso"""
+        if len(texto) != self.longitud or not texto.isdigit():
+            return None
+        instante = time.time() if instante is None else instante
+        self.lecturas.append((texto, float(confianza), instante))
+
+        if confianza >= self.confianza_inmediata:
+            self.reiniciar()
+            return texto, float(confianza)
+
+        return self.consenso(instante)
+
+    def consenso(self, instante=None):
+        """Calcula la cédula por votación; devuelve None si el acuerdo aún no es estable"""
+        instante = time.time() if instante is None else instante
+        vigentes = [(t, c) for t, c, i in self.lecturas if instante - i <= self.max_edad]
+        if len(vigentes) < self.minimo_lecturas:
+            return None
+
+        votos = [dict() for _ in range(self.longitud)]
+        for texto, confianza in vigentes:
+            peso = max(confianza, 1e-3)
+            for posicion, digito in enumerate(texto):
+                votos[posicion][digito] = votos[posicion].get(digito, 0.0) + peso
+
+        digitos = []
+        acuerdos = []
+        for votos_posicion in votos:
+            digito, peso_ganador = max(votos_posicion.items(), key=lambda item: item[1])
+            acuerdo = peso_ganador / sum(votos_posicion.values())
+            if acuerdo < self.umbral_acuerdo:
+                return None
+            digitos.append(digito)
+            acuerdos.append(acuerdo)
+
+        self.reiniciar()
+        return ''.join(digitos), min(acuerdos)
+
+    def apoyo(self, texto, instante=None):
+        """
+        Fracción del peso de las lecturas vigentes que coincide con cada dígito de texto. Una
+        posición con poco apoyo es la más probable de estar mal leída (1.0 si no hay lecturas).
+        """
+        instante = time.time() if instante is None else instante
+        vigentes = [(t, c) for t, c, i in self.lecturas if instante - i <= self.max_edad and len(t) == len(texto)]
+        if not vigentes:
+            return [1.0] * len(texto)
+        total = sum(max(c, 1e-3) for _, c in vigentes)
+        return [
+            sum(max(c, 1e-3) for t, c in vigentes if t[posicion] == digito) / total
+            for posicion, digito in enumerate(texto)
+        ]
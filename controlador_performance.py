@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from bitacora import obtener_logger
+
+log = obtener_logger("controlador")
+
+
+class ControladorPerformance:
+    """
+    Ajusta periódicamente ocr_interval, resize_factor, frame_skip_rate y target_fps del escáner
+    para mantener el OCR ocupado sin quitarle CPU a la captura.
+    """
+
+    # Límites seguros de cada parámetro (mínimo, máximo)
+    LIMITES = {
+        "ocr_interval": (0.05, 1.5),
+        "resize_factor": (0.35, 0.8),
+        "frame_skip_rate": (1, 6),
+        "target_fps": (10, 30),
+    }
+
+    def __init__(self, escaner, periodo=2.0, cpu_libre_minima=0.15, ocupacion_objetivo=0.85, tasa_descarte_maxima=0.2):
+        self.escaner = escaner
+        self.periodo = periodo  # Segundos entre ajustes
+        self.cpu_libre_minima = cpu_libre_minima  # Por debajo de esto se aligera la carga
+        self.ocupacion_objetivo = ocupacion_objetivo  # Fracción del tiempo que el OCR debería estar trabajando
+        self.tasa_descarte_maxima = tasa_descarte_maxima  # Descartes/encolados tolerados en la cola OCR
+        self.limites = dict(self.LIMITES)
+        self._ajustar_fps = True
+        self.num_cpus = os.cpu_count() or 1
+
+        self.hilo = None
+        self.activo = False
+        self._evento_detener = threading.Event()
+        self._anterior = None
+        self.ultima_medicion = None
+
+    def iniciar(self):
+        """Arranca el hilo de control si no está corriendo"""
+        if self.activo:
+            return
+        if self.hilo and self.hilo.is_alive():
+            self.hilo.join(timeout=1.0)
+        self.activo = True
+        self._anterior = None
+        self._evento_detener.clear()
+        self.hilo = threading.Thread(target=self._loop, daemon=True)
+        self.hilo.start()
+
+    def detener(self):
+        self.activo = False
+        self._evento_detener.set()
+
+    def ajustar_a_fuente(self, fuente):
+        """
+        El techo de target_fps sigue a la fuente (una cámara o video de 60 fps no se frena a 30)
+        y nunca queda por debajo de un target_fps fijado a mano
+        """
+        minimo, maximo = self.LIMITES["target_fps"]
+        self.limites["target_fps"] = (minimo, max(maximo, fuente.fps or 0, self.escaner.target_fps))
+        # Sin ritmo propio la captura no duerme y target_fps no tiene efecto
+        self._ajustar_fps = fuente.marca_ritmo()
+
+    def _loop(self):
+        while self.activo:
+            if self._evento_detener.wait(self.periodo):
+                break
+            if self.escaner.pausado:
+                # Sin tráfico no hay nada que medir; empezar de cero al reanudar
+                self._anterior = None
+                continue
+            try:
+                self.ajustar()
+            except Exception as e:
+                log.error("Error en el control adaptativo: %s", e)
+
+    def _medir(self):
+        """Toma una muestra de los contadores del escáner y la compara con la anterior"""
+        tiempo_ocr, latencias, trabajadores = self.escaner.medicion_ocr()
+        actual = {
+            "pared": time.perf_counter(),
+            "cpu": time.process_time(),
+            "frames": self.escaner.frames_capturados,
+            "encolados": self.escaner.ocr_encolados,
+            "descartados": self.escaner.ocr_descartados,
+            "tiempo_ocr": tiempo_ocr,
+        }
+        anterior, self._anterior = self._anterior, actual
+        if anterior is None:
+            return None
+
+        transcurrido = actual["pared"] - anterior["pared"]
+        if transcurrido <= 0:
+            return None
+        encolados = actual["encolados"] - anterior["encolados"]
+        return {
+            "latencia_ocr": sum(latencias) / len(latencias) if latencias else None,
+            "ocupacion_ocr": (actual["tiempo_ocr"] - anterior["tiempo_ocr"]) / (transcurrido * trabajadores),
+            "tasa_descarte": (actual["descartados"] - anterior["descartados"]) / encolados if encolados else 0.0,
+            "fps_captura": (actual["frames"] - anterior["frames"]) / transcurrido,
+            "cpu_libre": 1.0 - (actual["cpu"] - anterior["cpu"]) / (transcurrido * self.num_cpus),
+        }
+
+    def ajustar(self):
+        """Aplica un paso de ajuste según la última medición; devuelve los parámetros aplicados"""
+        medicion = self._medir()
+        if medicion is None:
+            return None
+        self.ultima_medicion = medicion
+
+        escaner = self.escaner
+        ocr_interval = escaner.ocr_interval
+        resize_factor = escaner.resize_factor
+        frame_skip_rate = escaner.frame_skip_rate
+        target_fps = escaner.target_fps
+        latencia = medicion["latencia_ocr"]
+
+        captura_hambrienta = medicion["fps_captura"] < 0.85 * target_fps and medicion["cpu_libre"] < 0.3
+        if medicion["cpu_libre"] < self.cpu_libre_minima or captura_hambrienta:
+            # CPU al límite: reducir primero el trabajo por frame OCR, luego la captura
+            if resize_factor > self.limites["resize_factor"][0]:
+                resize_factor -= 0.05
+            elif self._ajustar_fps and target_fps > self.limites["target_fps"][0]:
+                target_fps -= 5
+                frame_skip_rate += 1
+            else:
+                ocr_interval *= 1.25
+        elif medicion["tasa_descarte"] > self.tasa_descarte_maxima:
+            # El OCR no da abasto: espaciar los envíos hasta su latencia real
+            ocr_interval = max(ocr_interval * 1.25, latencia or 0.0)
+        elif medicion["ocupacion_ocr"] < self.ocupacion_objetivo:
+            # OCR ocioso: enviar más seguido y, con CPU de sobra, recuperar calidad y fps
+            minimo = latencia * 0.9 if latencia else 0.0
+            ocr_interval = max(ocr_interval * 0.85, minimo)
+            if medicion["cpu_libre"] > 2 * self.cpu_libre_minima:
+                if self._ajustar_fps and target_fps < self.limites["target_fps"][1]:
+                    target_fps += 5
+                    frame_skip_rate -= 1
+                elif resize_factor < self.limites["resize_factor"][1]:
+                    resize_factor += 0.05
+
+        parametros = {
+            "ocr_interval": self._acotar("ocr_interval", ocr_interval),
+            "resize_factor": round(self._acotar("resize_factor", resize_factor), 2),
+            "frame_skip_rate": int(self._acotar("frame_skip_rate", frame_skip_rate)),
+            "target_fps": self._acotar("target_fps", target_fps),
+        }
+        escaner.ajustar_parametros_performance(**parametros)
+        return parametros
+
+    def _acotar(self, nombre, valor):
+        minimo, maximo = self.limites[nombre]
+        return min(maximo, max(minimo, valor))
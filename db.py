@@ -1,5 +1,8 @@
 import sqlite3
 import os
+from bitacora import obtener_logger
+
+log = obtener_logger("db")
 
 def crear_base_de_datos(nombre_db="cedulas.db"):
     """
@@ -8,9 +11,9 @@ def crear_base_de_datos(nombre_db="cedulas.db"):
     try:
         # Verificar si el archivo ya existe
         if os.path.exists(nombre_db):
-            print(f"La base de datos '{nombre_db}' ya existe.")
+            log.info("La base de datos '%s' ya existe.", nombre_db)
         else:
-            print(f"Creando nueva base de datos '{nombre_db}'")
+            log.info("Creando nueva base de datos '%s'", nombre_db)
         
         # Conectar a la base de datos (la crea si no existe)
         conexion = sqlite3.connect(nombre_db)
@@ -31,7 +34,7 @@ def crear_base_de_datos(nombre_db="cedulas.db"):
         );
         """
         cursor.execute(crear_tabla_query)
-        print("Tabla 'cedulas_registradas' creada o ya existente")
+        log.info("Tabla 'cedulas_registradas' creada o ya existente")
         
         # Crear tabla historial
         crear_historial_query = """
@@ -45,36 +48,36 @@ def crear_base_de_datos(nombre_db="cedulas.db"):
         );
         """
         cursor.execute(crear_historial_query)
-        print("Tabla 'historial' creada o ya existente")
+        log.info("Tabla 'historial' creada o ya existente")
         
         # Crear índices para optimizar búsquedas
         try:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_cedula ON cedulas_registradas(numero_de_cedula)")
-            print("Índice para número de cédula creado o ya existente")
+            log.info("Índice para número de cédula creado o ya existente")
             
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_hash ON cedulas_registradas(codigo_hash)")
-            print("Índice para código hash creado o ya existente")
+            log.info("Índice para código hash creado o ya existente")
             
             # Índices para la tabla historial
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_historial_cedula ON historial(numero_de_cedula)")
-            print("Índice para historial por cédula creado o ya existente")
+            log.info("Índice para historial por cédula creado o ya existente")
             
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_historial_fecha ON historial(dia)")
-            print("Índice para historial por fecha creado o ya existente")
+            log.info("Índice para historial por fecha creado o ya existente")
                 
         except sqlite3.Error as e:
-            print(f"Error al crear índices: {e}")
+            log.error("Error al crear índices: %s", e)
             
         # Confirmar cambios
         conexion.commit()
-        print("Base de datos configurada correctamente")
+        log.info("Base de datos configurada correctamente")
         
     except sqlite3.Error as e:
-        print(f"Error SQLite: {e}")
+        log.error("Error SQLite: %s", e)
     finally:
         if 'conexion' in locals():
             conexion.close()
-            print("Conexión cerrada")
+            log.info("Conexión cerrada")
 
 if __name__ == "__main__":
     crear_base_de_datos()
@@ -0,0 +1,244 @@
+import os
+import time
+import cv2
+import numpy as np
+
+
+class FuenteFrames:
+    """Interfaz común de las fuentes de frames que alimentan al escáner"""
+
+    def __init__(self, fps=30, tiempo_real=True):
+        self.fps = fps
+        self.tiempo_real = tiempo_real  # False entrega los frames tan rápido como se pidan
+        self._proximo_frame = None
+
+    def abrir(self):
+        """Prepara la fuente; lanza una excepción si no está disponible"""
+        self._proximo_frame = None
+        return True
+
+    def leer(self, destino=None):
+        """
+        Devuelve (ok, frame) como cv2.VideoCapture.read. Si se pasa un arreglo destino con la
+        misma forma, el frame se escribe en él en lugar de reservar memoria nueva.
+        """
+        raise NotImplementedError
+
+    def descartar(self):
+        """Avanza un frame sin decodificarlo; por defecto equivale a leer y tirar"""
+        ok, _ = self.leer()
+        return ok
+
+    def marca_ritmo(self):
+        """Indica si descartar() espera al siguiente frame (cámara o tiempo real simulado)"""
+        return bool(self.tiempo_real and self.fps)
+
+    def esta_abierta(self):
+        return False
+
+    def agotada(self):
+        """Indica si una fuente finita ya no tiene más frames"""
+        return False
+
+    def resolucion(self):
+        """(ancho, alto) de los frames de la fuente abierta, o None si no se conoce"""
+        return None
+
+    def liberar(self):
+        pass
+
+    def _esperar_turno(self):
+        """Espera hasta el momento del siguiente frame cuando se simula tiempo real"""
+        if not self.tiempo_real or not self.fps:
+            return
+        ahora = time.perf_counter()
+        if self._proximo_frame is None:
+            self._proximo_frame = ahora
+        espera = self._proximo_frame - ahora
+        if espera > 0:
+            time.sleep(espera)
+        self._proximo_frame = max(self._proximo_frame, ahora) + 1.0 / self.fps
+
+
+class FuenteCamara(FuenteFrames):
+    """Cámara en vivo a través de cv2.VideoCapture"""
+
+    def __init__(self, indice=0, ancho=1280, alto=720, fps=30):
+        super().__init__(fps=fps, tiempo_real=False)  # La cámara marca su propio ritmo
+        self.indice = indice
+        self.ancho = ancho
+        self.alto = alto
+        self.cap = None
+
+    def abrir(self):
+        if self.esta_abierta():
+            return True
+
+        self.cap = cv2.VideoCapture(self.indice)
+        if not self.cap.isOpened():
+            raise Exception("No se pudo abrir la cámara")
+
+        # Optimizar configuración de la cámara
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.ancho)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.alto)
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Buffer mínimo para reducir latencia
+        return True
+
+    def leer(self, destino=None):
+        return self.cap.read(destino)
+
+    def descartar(self):
+        # grab() no decodifica, solo vacía el buffer de la cámara
+        return self.cap.grab()
+
+    def marca_ritmo(self):
+        # grab() bloquea hasta que el driver entrega el siguiente frame
+        return True
+
+    def resolucion(self):
+        # La cámara puede no aceptar el tamaño pedido: se consulta el que quedó
+        if not self.esta_abierta():
+            return None
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def esta_abierta(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def liberar(self):
+        if self.esta_abierta():
+            self.cap.release()
+        self.cap = None
+
+
+class FuenteVideo(FuenteFrames):
+    """Archivo de video grabado, por ejemplo para reproducir un problema visto en campo"""
+
+    def __init__(self, ruta, tiempo_real=True, repetir=False):
+        super().__init__(fps=None, tiempo_real=tiempo_real)
+        self.ruta = ruta
+        self.repetir = repetir
+        self.cap = None
+        self._agotada = False
+
+    def abrir(self):
+        super().abrir()
+        self.cap = cv2.VideoCapture(self.ruta)
+        if not self.cap.isOpened():
+            raise Exception(f"No se pudo abrir el video '{self.ruta}'")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self._agotada = False
+        return True
+
+    def leer(self, destino=None):
+        self._esperar_turno()
+        ok, frame = self.cap.read(destino)
+        if not ok and self.repetir:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read(destino)
+        if not ok:
+            self._agotada = True
+        return ok, frame
+
+    def descartar(self):
+        self._esperar_turno()
+        ok = self.cap.grab()
+        if not ok and self.repetir:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok = self.cap.grab()
+        if not ok:
+            self._agotada = True
+        return ok
+
+    def esta_abierta(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def agotada(self):
+        return self._agotada
+
+    def resolucion(self):
+        if not self.esta_abierta():
+            return None
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def liberar(self):
+        if self.esta_abierta():
+            self.cap.release()
+        self.cap = None
+
+
+class FuenteSintetica(FuenteFrames):
+    """Frames en memoria (arreglos BGR), útil para pruebas de rendimiento sin cámara"""
+
+    def __init__(self, frames, fps=30, tiempo_real=False, repetir=True):
+        super().__init__(fps=fps, tiempo_real=tiempo_real)
+        self.frames = list(frames)
+        self.repetir = repetir
+        self.indice = 0
+        self.abierta = False
+
+    def abrir(self):
+        super().abrir()
+        if not self.frames:
+            raise Exception("La fuente sintética no tiene frames")
+        self.indice = 0
+        self.abierta = True
+        return True
+
+    def leer(self, destino=None):
+        if self.agotada():
+            return False, None
+        self._esperar_turno()
+        frame = self.frames[self.indice]
+        self.indice += 1
+        if self.repetir and self.indice >= len(self.frames):
+            self.indice = 0
+        # Copia para que quien la reciba pueda modificarla sin alterar la fuente
+        if destino is not None and destino.shape == frame.shape and destino.dtype == frame.dtype:
+            np.copyto(destino, frame)
+            return True, destino
+        return True, frame.copy()
+
+    def descartar(self):
+        if self.agotada():
+            return False
+        self._esperar_turno()
+        self.indice += 1
+        if self.repetir and self.indice >= len(self.frames):
+            self.indice = 0
+        return True
+
+    def esta_abierta(self):
+        return self.abierta
+
+    def agotada(self):
+        return not self.repetir and self.indice >= len(self.frames)
+
+    def resolucion(self):
+        if not self.frames:
+            return None
+        return max(frame.shape[1] for frame in self.frames), max(frame.shape[0] for frame in self.frames)
+
+    def liberar(self):
+        self.abierta = False
+
+
+class FuenteImagenes(FuenteSintetica):
+    """Carpeta de imágenes (capturas etiquetadas o extraídas de una grabación) leídas en orden alfabético"""
+
+    EXTENSIONES = ('.png', '.jpg', '.jpeg', '.bmp')
+
+    def __init__(self, directorio, fps=30, tiempo_real=False, repetir=True):
+        super().__init__([], fps=fps, tiempo_real=tiempo_real, repetir=repetir)
+        self.directorio = directorio
+
+    def abrir(self):
+        if not self.frames:
+            # Se cargan una sola vez para que la lectura del disco no cuente en el rendimiento
+            rutas = sorted(
+                os.path.join(self.directorio, nombre)
+                for nombre in os.listdir(self.directorio)
+                if nombre.lower().endswith(self.EXTENSIONES)
+            )
+            self.frames = [frame for frame in (cv2.imread(ruta) for ruta in rutas) if frame is not None]
+        return super().abrir()
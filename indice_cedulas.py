@@ -0,0 +1,118 @@
+import threading
+
+
+def distancia_edicion(a, b):
+    """Distancia de Levenshtein entre dos cadenas cortas"""
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, caracter_a in enumerate(a, 1):
+        actual = [i]
+        for j, caracter_b in enumerate(b, 1):
+            actual.append(min(
+                anterior[j] + 1,
+                actual[j - 1] + 1,
+                anterior[j - 1] + (caracter_a != caracter_b),
+            ))
+        anterior = actual
+    return anterior[-1]
+
+
+class IndiceCedulas:
+    """
+    Índice en memoria (BK-tree) de los números de cédula registrados para corregir lecturas OCR
+    con uno o dos dígitos mal leídos hacia la cédula registrada más cercana.
+    """
+
+    def __init__(self, cedulas=(), max_distancia=1):
+        self.max_distancia = max_distancia  # Distancia de edición máxima para aceptar una corrección
+        self._raiz = None  # Nodos [cedula, {distancia: hijo}]
+        self._en_arbol = set()
+        self._vigentes = set()  # Las cédulas eliminadas quedan en el árbol pero no se devuelven
+        self._lock = threading.Lock()
+        for cedula in cedulas:
+            self.agregar(cedula)
+
+    def __len__(self):
+        return len(self._vigentes)
+
+    def __contains__(self, cedula):
+        return cedula in self._vigentes
+
+    def agregar(self, cedula):
+        """Agrega (o vuelve a habilitar) una cédula registrada"""
+        cedula = str(cedula)
+        with self._lock:
+            self._vigentes.add(cedula)
+            if cedula in self._en_arbol:
+                return
+            self._en_arbol.add(cedula)
+            if self._raiz is None:
+                self._raiz = [cedula, {}]
+                return
+            nodo = self._raiz
+            while True:
+                distancia = distancia_edicion(cedula, nodo[0])
+                hijo = nodo[1].get(distancia)
+                if hijo is None:
+                    nodo[1][distancia] = [cedula, {}]
+                    return
+                nodo = hijo
+
+    def quitar(self, cedula):
+        with self._lock:
+            self._vigentes.discard(str(cedula))
+
+    def reconstruir(self, cedulas):
+        """Reemplaza el contenido completo (p. ej. tras cambios masivos en la base)"""
+        with self._lock:
+            self._raiz = None
+            self._en_arbol = set()
+            self._vigentes = set()
+        for cedula in cedulas:
+            self.agregar(cedula)
+
+    def candidatos(self, texto, max_distancia=None):
+        """Devuelve [(cedula, distancia)] de las cédulas vigentes a max_distancia o menos del texto"""
+        max_distancia = self.max_distancia if max_distancia is None else max_distancia
+        encontrados = []
+        with self._lock:
+            pendientes = [self._raiz] if self._raiz is not None else []
+            while pendientes:
+                cedula, hijos = pendientes.pop()
+                distancia = distancia_edicion(texto, cedula)
+                if distancia <= max_distancia and cedula in self._vigentes:
+                    encontrados.append((cedula, distancia))
+                # Desigualdad triangular: solo los hijos en [d - max, d + max] pueden estar cerca
+                for distancia_hijo, hijo in hijos.items():
+                    if distancia - max_distancia <= distancia_hijo <= distancia + max_distancia:
+                        pendientes.append(hijo)
+        return encontrados
+
+    def ajustar(self, texto, apoyo=None, max_distancia=None):
+        """
+        Devuelve (cedula, distancia) de la cédula registrada más cercana o None si no hay ninguna
+        lo bastante cerca o si dos quedan empatadas. Con apoyo (confianza por posición, ver
+        VotadorConsenso.apoyo) los empates se resuelven a favor de la cédula que solo difiere en
+        las posiciones menos confiables.
+        """
+        candidatos = self.candidatos(texto, max_distancia)
+        if not candidatos:
+            return None
+        menor = min(distancia for _, distancia in candidatos)
+        mejores = [cedula for cedula, distancia in candidatos if distancia == menor]
+        if len(mejores) == 1:
+            return mejores[0], menor
+        if apoyo is None:
+            return None
+
+        def costo(cedula):
+            # Cambiar un dígito bien apoyado cuesta más que uno dudoso
+            if len(cedula) != len(texto):
+                return float("inf")
+            return sum(apoyo[i] for i, (a, b) in enumerate(zip(texto, cedula)) if a != b)
+
+        costos = sorted((costo(cedula), cedula) for cedula in mejores)
+        if costos[0][0] == costos[1][0]:
+            return None
+        return costos[0][1], menor
@@ -0,0 +1,98 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+class HistogramaLatencias:
+    """Histograma de latencias con cubetas fijas en escala logarítmica (registrar cuesta O(log n))"""
+
+    # Límites superiores de cada cubeta en milisegundos; la última cubeta no tiene límite
+    LIMITES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.cubetas = [0] * (len(self.LIMITES_MS) + 1)
+            self.cantidad = 0
+            self.total = 0.0
+            self.maximo = 0.0
+
+    def registrar(self, segundos):
+        milisegundos = segundos * 1000.0
+        indice = bisect.bisect_left(self.LIMITES_MS, milisegundos)
+        with self._lock:
+            self.cubetas[indice] += 1
+            self.cantidad += 1
+            self.total += milisegundos
+            if milisegundos > self.maximo:
+                self.maximo = milisegundos
+
+    def percentil(self, fraccion, cubetas=None, cantidad=None):
+        """Estimación del percentil: límite superior de la cubeta donde cae, acotado por el máximo"""
+        cubetas = self.cubetas if cubetas is None else cubetas
+        cantidad = self.cantidad if cantidad is None else cantidad
+        if not cantidad:
+            return None
+        objetivo = fraccion * cantidad
+        acumulado = 0
+        for indice, cuenta in enumerate(cubetas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                # El límite de la cubeta puede quedar por encima de la mayor muestra registrada
+                return min(self.LIMITES_MS[indice], round(self.maximo, 3)) if indice < len(self.LIMITES_MS) else round(self.maximo, 3)
+        return round(self.maximo, 3)
+
+    def resumen(self):
+        """Copia consistente del histograma con promedio, p50, p95 y máximo en milisegundos"""
+        with self._lock:
+            cubetas = list(self.cubetas)
+            cantidad, total, maximo = self.cantidad, self.total, self.maximo
+        return {
+            "cantidad": cantidad,
+            "promedio_ms": round(total / cantidad, 3) if cantidad else None,
+            "p50_ms": self.percentil(0.5, cubetas, cantidad),
+            "p95_ms": self.percentil(0.95, cubetas, cantidad),
+            "max_ms": round(maximo, 3) if cantidad else None,
+            # Clave: límite superior de la cubeta en ms ("inf" para la última)
+            "cubetas": {
+                str(limite): cuenta
+                for limite, cuenta in zip(self.LIMITES_MS + ("inf",), cubetas) if cuenta
+            },
+        }
+
+
+class MetricasEtapas:
+    """Un histograma de latencias por etapa del pipeline, creado la primera vez que se mide"""
+
+    def __init__(self):
+        self.etapas = {}
+        self._lock = threading.Lock()
+
+    def histograma(self, etapa):
+        histograma = self.etapas.get(etapa)
+        if histograma is None:
+            with self._lock:
+                histograma = self.etapas.setdefault(etapa, HistogramaLatencias())
+        return histograma
+
+    def registrar(self, etapa, segundos):
+        self.histograma(etapa).registrar(segundos)
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio)
+
+    def reiniciar(self):
+        for histograma in list(self.etapas.values()):
+            histograma.reiniciar()
+
+    def resumen(self):
+        return {etapa: histograma.resumen() for etapa, histograma in list(self.etapas.items())}
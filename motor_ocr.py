@@ -0,0 +1,323 @@
+import math
+import time
+import cv2
+import numpy as np
+from procesamiento import LocalizadorCedula, crear_perfil
+from reconocedor_digitos import ReconocedorDigitos
+from metricas import MetricasEtapas
+
+try:
+    import easyocr
+except ImportError:
+    # Kioscos sin PyTorch: solo el reconocedor de dígitos (respaldo_easyocr=False)
+    easyocr = None
+
+
+class MotorOCR:
+    """Localiza la cédula en un frame, lo preprocesa y lee los números con EasyOCR"""
+
+    def __init__(self, idiomas=('es',), gpu=True, modo="digitos", localizar_cedula=True, perfil="calidad",
+                 ruta_reconocedor=None, respaldo_easyocr=True,
+                 backend="torch", directorio_onnx="modelos_onnx", cuantizar_onnx=True, hilos_onnx=None):
+        self.reader = None
+        self.idiomas = list(idiomas)
+        self.gpu = gpu
+
+        # Localización de la cédula: solo el recorte normalizado pasa al OCR
+        self.localizar_cedula = localizar_cedula
+        self.localizador = LocalizadorCedula()
+
+        # Modo OCR: "digitos" (detect + recognize solo de cajas con forma de cédula) o "completo" (readtext)
+        self.modo = modo
+        self.proporcion_caja_min = 3.0  # Ancho/alto mínimo de una caja con 9 dígitos
+        self.proporcion_caja_max = 14.0  # Ancho/alto máximo (tolera espacios entre grupos)
+        self.altura_caja_min = 10
+
+        # Perfiles de preprocesamiento ya usados (conservan sus filtros y estadísticas al alternar)
+        self.perfiles = {}
+        self.perfil = None
+        self.usar_perfil(perfil)
+
+        # Reconocedor liviano de dígitos (ver reconocedor_digitos.py); EasyOCR solo si duda
+        self.ruta_reconocedor = ruta_reconocedor
+        self.reconocedor = None
+        self.confianza_reconocedor = 0.8
+        self.respaldo_easyocr = respaldo_easyocr
+        self.lecturas_reconocedor = 0
+        self.lecturas_easyocr = 0
+        # Píxeles que entraron a la localización y que salieron en el recorte de la cédula
+        self.pixeles_frame = 0
+        self.pixeles_recorte = 0
+        self.recortes = 0
+
+        # Inferencia de EasyOCR: "torch" (la de siempre) u "onnx" (onnxruntime en CPU, ver backend_onnx.py)
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Backend OCR desconocido: '{backend}'")
+        self.backend = backend
+        self.directorio_onnx = directorio_onnx
+        self.cuantizar_onnx = cuantizar_onnx  # Reconocedor con cuantización dinámica int8
+        self.hilos_onnx = hilos_onnx
+
+        # Latencia por etapa (localización, preprocesamiento, detección, reconocimiento...)
+        self.metricas = MetricasEtapas()
+
+    def usar_perfil(self, nombre):
+        """Selecciona el perfil de preprocesamiento ("ninguno", "rapido", "calidad" o "adaptativo")"""
+        if nombre not in self.perfiles:
+            self.perfiles[nombre] = crear_perfil(nombre)
+        self.perfil = nombre
+
+    def estadisticas_perfiles(self):
+        """Costo promedio de preprocesamiento y tasa de acierto de cada perfil usado"""
+        return {nombre: perfil.estadisticas() for nombre, perfil in self.perfiles.items()}
+
+    def configuracion(self):
+        """Argumentos para reconstruir un motor equivalente (p. ej. dentro de un proceso trabajador)"""
+        return {
+            "idiomas": self.idiomas,
+            "gpu": self.gpu,
+            "modo": self.modo,
+            "localizar_cedula": self.localizar_cedula,
+            "perfil": self.perfil,
+            "ruta_reconocedor": self.ruta_reconocedor,
+            "respaldo_easyocr": self.respaldo_easyocr,
+            "backend": self.backend,
+            "directorio_onnx": self.directorio_onnx,
+            "cuantizar_onnx": self.cuantizar_onnx,
+            "hilos_onnx": self.hilos_onnx,
+        }
+
+    def cargar(self):
+        """Carga el reconocedor de dígitos y el modelo de EasyOCR (operación lenta, se hace una sola vez)"""
+        if self.ruta_reconocedor and self.reconocedor is None:
+            self.reconocedor = ReconocedorDigitos.cargar(self.ruta_reconocedor)
+        if self.respaldo_easyocr and self.reader is None:
+            if easyocr is None:
+                raise Exception("EasyOCR no está instalado; use respaldo_easyocr=False con un reconocedor de dígitos")
+            if self.backend == "onnx":
+                # Import diferido: backend_onnx trae torch y onnxruntime, que el resto no necesita
+                from backend_onnx import instalar_onnx
+                # Sin quantize: EasyOCR cuantizaría el reconocedor con torch y eso no se puede exportar;
+                # el int8 lo aplica onnxruntime al exportar
+                reader = easyocr.Reader(self.idiomas, gpu=False, quantize=False)
+                self.reader = instalar_onnx(reader, self.directorio_onnx, self.cuantizar_onnx, self.hilos_onnx)
+            else:
+                self.reader = easyocr.Reader(self.idiomas, gpu=self.gpu)  # Usar GPU si está disponible
+        return self.reader
+
+    def listo(self):
+        """Indica si ya se cargó todo lo necesario para analizar frames"""
+        if self.ruta_reconocedor and self.reconocedor is None:
+            return False
+        return self.reader is not None or not self.respaldo_easyocr
+
+    def analizar(self, frame):
+        """
+        Devuelve las lecturas (bbox, texto, confianza) con el bbox en coordenadas del frame recibido,
+        o None si no se encontró ninguna cédula en el frame.
+        """
+        preparado = self._preparar(frame)
+        if not isinstance(preparado, tuple):
+            return preparado
+        frame_procesado, matriz_inversa, costo = preparado
+
+        # Ejecutar OCR con configuraciones optimizadas
+        resultados = self.ejecutar_ocr(frame_procesado)
+        return self._finalizar(resultados, matriz_inversa, costo)
+
+    def analizar_lote(self, frames):
+        """
+        Como analizar, pero para varios frames: las cajas candidatas de todos se reconocen en una
+        sola llamada por lotes al reconocedor. Devuelve una lista con las lecturas de cada frame.
+        """
+        if self.modo != "digitos" or len(frames) == 1:
+            return [self.analizar(frame) for frame in frames]
+
+        resultados = [None] * len(frames)
+        pendientes = []  # (frame, matriz_inversa, costo, cajas)
+        recortes = []
+        for indice, frame in enumerate(frames):
+            preparado = self._preparar(frame)
+            if not isinstance(preparado, tuple):
+                resultados[indice] = preparado
+                continue
+            frame_procesado, matriz_inversa, costo = preparado
+            cajas = self._cajas_candidatas(frame_procesado)
+            # El perfil reutiliza su buffer con el próximo frame: los recortes se copian ya
+            recortes.extend(self._recortar_caja(frame_procesado, caja) for caja in cajas)
+            pendientes.append((indice, matriz_inversa, costo, cajas))
+
+        textos = self._reconocer_recortes(recortes) if recortes else []
+        posicion = 0
+        for indice, matriz_inversa, costo, cajas in pendientes:
+            lecturas_frame = [
+                (caja, texto, conf)
+                for caja, (texto, conf) in zip(cajas, textos[posicion:posicion + len(cajas)])
+                if texto
+            ]
+            posicion += len(cajas)
+            resultados[indice] = self._finalizar(lecturas_frame, matriz_inversa, costo)
+        return resultados
+
+    def _preparar(self, frame):
+        """
+        Localiza, intenta el reconocedor de dígitos y preprocesa. Devuelve la respuesta final si el
+        frame ya quedó resuelto (None, [] o la lectura rápida) o (frame_procesado, matriz_inversa, costo).
+        """
+        matriz_inversa = None
+        if self.localizar_cedula:
+            # Recortar la cédula; si no hay tarjeta en el frame no vale la pena correr OCR
+            pixeles_frame = frame.shape[0] * frame.shape[1]
+            with self.metricas.medir("localizacion"):
+                frame, matriz_inversa = self.localizador.recortar(frame)
+            if frame is None:
+                return None
+            self.recortes += 1
+            self.pixeles_frame += pixeles_frame
+            self.pixeles_recorte += frame.shape[0] * frame.shape[1]
+
+        # Primero el reconocedor de dígitos: microsegundos frente a cientos de milisegundos
+        if self.reconocedor is not None:
+            with self.metricas.medir("reconocedor_digitos"):
+                rapida = self.reconocedor.reconocer(frame)
+            if rapida is not None and (rapida[2] >= self.confianza_reconocedor or self.reader is None):
+                self.lecturas_reconocedor += 1
+                bbox, texto, conf = rapida
+                if matriz_inversa is not None:
+                    bbox = self.localizador.mapear_a_frame(bbox, matriz_inversa)
+                return [([[float(x), float(y)] for x, y in bbox], texto, conf)]
+        if self.reader is None:
+            # Sin EasyOCR de respaldo no hay más que intentar en este frame
+            return []
+        self.lecturas_easyocr += 1
+
+        # Preprocesar imagen para mejor OCR
+        inicio = time.perf_counter()
+        frame_procesado = self.perfiles[self.perfil].aplicar(frame)
+        costo = time.perf_counter() - inicio
+        self.metricas.registrar("preprocesamiento", costo)
+        return frame_procesado, matriz_inversa, costo
+
+    def _finalizar(self, resultados, matriz_inversa, costo):
+        """Registra el acierto del perfil y lleva las cajas a coordenadas del frame original"""
+        self.perfiles[self.perfil].registrar(costo, any(
+            len(''.join(filter(str.isdigit, texto))) == 9 for _, texto, _ in resultados
+        ))
+
+        lecturas = []
+        for bbox, texto, conf in resultados:
+            if matriz_inversa is not None:
+                bbox = self.localizador.mapear_a_frame(bbox, matriz_inversa)
+            lecturas.append(([[float(x), float(y)] for x, y in bbox], texto, float(conf)))
+        return lecturas
+
+    def preprocesar(self, frame):
+        """Preprocesa la imagen con el perfil seleccionado para mejorar el OCR"""
+        return self.perfiles[self.perfil].aplicar(frame)
+
+    def ejecutar_ocr(self, imagen):
+        """Ejecuta el OCR según el modo configurado y devuelve tuplas (bbox, texto, confianza)"""
+        if self.modo == "digitos":
+            return self._ocr_solo_digitos(imagen)
+        with self.metricas.medir("ocr_completo"):
+            return self.reader.readtext(
+                imagen,
+                width_ths=0.7,
+                height_ths=0.7,
+                paragraph=False,
+                detail=1
+            )
+
+    def _cajas_candidatas(self, imagen):
+        """Detecta texto y devuelve las cajas con forma de número de cédula como 4 puntos"""
+        with self.metricas.medir("deteccion"):
+            horizontal_list, free_list = self.reader.detect(imagen, width_ths=0.7, height_ths=0.7)
+        cajas = []
+        for x_min, x_max, y_min, y_max in horizontal_list[0]:
+            if self._proporcion_parece_cedula(x_max - x_min, y_max - y_min):
+                cajas.append([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]])
+        cajas.extend(caja for caja in free_list[0] if self._caja_libre_parece_cedula(caja))
+        return cajas
+
+    def _recortar_caja(self, imagen, caja, alto=64):
+        """Endereza la caja (4 puntos) a una franja horizontal de la altura del reconocedor"""
+        puntos = np.array(caja, dtype=np.float32)
+        ancho_caja = max(np.linalg.norm(puntos[1] - puntos[0]), 1.0)
+        alto_caja = max(np.linalg.norm(puntos[3] - puntos[0]), 1.0)
+        ancho = max(int(round(ancho_caja * alto / alto_caja)), 1)
+        destino = np.array([[0, 0], [ancho - 1, 0], [ancho - 1, alto - 1], [0, alto - 1]], dtype=np.float32)
+        matriz = cv2.getPerspectiveTransform(puntos, destino)
+        return cv2.warpPerspective(imagen, matriz, (ancho, alto), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+    def _reconocer_recortes(self, recortes):
+        """
+        Reconoce varias franjas de 64 px con una sola pasada del reconocedor. Reader.recognize en
+        CPU ignora batch_size y corre caja por caja, así que se arma la lista de imágenes que EasyOCR
+        construye por dentro y se llama a get_text con un lote del tamaño de la lista.
+        Devuelve (texto, confianza) por recorte, en el mismo orden.
+        """
+        if hasattr(self.reader, "reconocer_franjas"):
+            # Lectores sustitutos (benchmark) sin modelo de EasyOCR
+            with self.metricas.medir("reconocimiento_lote"):
+                return self.reader.reconocer_franjas(recortes)
+
+        from easyocr.recognition import get_text
+        alto = 64
+        # El índice ocupa el lugar de la caja: get_text devuelve los resultados en el orden de la lista
+        lista = [
+            (indice, cv2.cvtColor(recorte, cv2.COLOR_BGR2GRAY) if recorte.ndim == 3 else recorte)
+            for indice, recorte in enumerate(recortes)
+        ]
+        # Mismo ancho de entrada que calcula easyocr.utils.get_image_list
+        ancho = math.ceil(max(max(imagen.shape[1] / imagen.shape[0] for _, imagen in lista), 1.0)) * alto
+        ignorar = ''.join(set(self.reader.character) - set('0123456789'))
+
+        with self.metricas.medir("reconocimiento_lote"):
+            resultados = get_text(
+                self.reader.character, alto, ancho, self.reader.recognizer, self.reader.converter, lista,
+                ignore_char=ignorar, decoder='greedy', beamWidth=5, batch_size=len(lista),
+                contrast_ths=0.1, adjust_contrast=0.5, filter_ths=0.003, workers=0, device=self.reader.device
+            )
+
+        textos = [("", 0.0)] * len(recortes)
+        for indice, texto, conf in resultados:
+            textos[indice] = (texto, float(conf))
+        return textos
+
+    def _ocr_solo_digitos(self, imagen):
+        """Detecta texto una vez y reconoce solo las cajas con forma de número de cédula"""
+        with self.metricas.medir("deteccion"):
+            horizontal_list, free_list = self.reader.detect(imagen, width_ths=0.7, height_ths=0.7)
+        cajas_horizontales = [c for c in horizontal_list[0] if self._caja_parece_cedula(c)]
+        cajas_libres = [c for c in free_list[0] if self._caja_libre_parece_cedula(c)]
+
+        if not cajas_horizontales and not cajas_libres:
+            return []
+
+        with self.metricas.medir("reconocimiento"):
+            return self.reader.recognize(
+                imagen,
+                horizontal_list=cajas_horizontales,
+                free_list=cajas_libres,
+                allowlist='0123456789',
+                detail=1
+            )
+
+    def _caja_parece_cedula(self, caja):
+        """Filtra cajas horizontales [x_min, x_max, y_min, y_max] por proporción de 9 dígitos"""
+        x_min, x_max, y_min, y_max = caja
+        return self._proporcion_parece_cedula(x_max - x_min, y_max - y_min)
+
+    def _caja_libre_parece_cedula(self, caja):
+        """Filtra cajas inclinadas (4 puntos) por proporción de 9 dígitos"""
+        puntos = np.array(caja, dtype=np.float32)
+        ancho = np.linalg.norm(puntos[1] - puntos[0])
+        alto = np.linalg.norm(puntos[3] - puntos[0])
+        return self._proporcion_parece_cedula(ancho, alto)
+
+    def _proporcion_parece_cedula(self, ancho, alto):
+        """Verifica que el ancho/alto de una caja corresponda a una línea de 9 dígitos"""
+        if alto < self.altura_caja_min:
+            return False
+        proporcion = ancho / float(alto)
+        return self.proporcion_caja_min <= proporcion <= self.proporcion_caja_max
@@ -0,0 +1,273 @@
+import queue
+import threading
+import time
+from typing import Callable
+from IR_scanner import EscanerCedula, DespachadorEventos
+from motor_ocr import MotorOCR
+from pool_ocr import PoolOCR
+from fuentes_video import FuenteFrames, FuenteCamara
+from bitacora import obtener_logger
+
+log = obtener_logger("multi_camara")
+
+
+class PlanificadorOCR:
+    """Atiende por turnos las colas OCR de varios escáneres con un único modelo o pool de procesos"""
+
+    def __init__(self, motor: MotorOCR, pool: PoolOCR = None, tamano_lote=4, espera_lote=0.05):
+        self.motor = motor
+        self.pool = pool
+        # Sin pool, las cajas de hasta tamano_lote frames (de cualquier cámara) se reconocen juntas
+        self.tamano_lote = tamano_lote
+        self.espera_lote = espera_lote
+        self.escaneres = []
+        self.atendidos = {}  # Frames OCR atendidos por cámara
+        self.activo = False
+        self.hilo = None
+        self._turno = 0
+        self._evento = threading.Event()
+
+    def registrar(self, escaner: EscanerCedula):
+        """Conecta un escáner al planificador; su motor pasa a ser el compartido"""
+        escaner.planificador = self
+        escaner.motor = self.motor
+        self.atendidos[escaner.id_camara] = 0
+        # Lista nueva en vez de append: el hilo del planificador puede estar recorriéndola
+        self.escaneres = self.escaneres + [escaner]
+
+    def notificar(self):
+        """Avisa que alguna cola OCR tiene trabajo nuevo"""
+        self._evento.set()
+
+    def iniciar(self):
+        if self.activo:
+            return
+        self.activo = True
+        self.hilo = threading.Thread(target=self._loop, daemon=True)
+        self.hilo.start()
+
+    def detener(self):
+        self.activo = False
+        self._evento.set()
+        if self.hilo and self.hilo.is_alive():
+            self.hilo.join(timeout=1.0)
+
+    def _loop(self):
+        while self.activo:
+            self._evento.clear()
+            trabajo = self._siguiente_trabajo()
+            if trabajo is None:
+                self._evento.wait(0.05)
+                continue
+
+            escaner, frame = trabajo
+            self.atendidos[escaner.id_camara] += 1
+            trabajos = [trabajo]
+            try:
+                if self.pool:
+                    # El resultado vuelve al escáner de la cámara que envió el frame
+                    if not self.pool.enviar(frame, timeout=0.5, destino=escaner._atender_lecturas):
+                        escaner.ocr_descartados += 1
+                elif self.tamano_lote > 1:
+                    self._procesar_lote(self._completar_lote(trabajos))
+                else:
+                    escaner._procesar_frame_ocr(frame)
+            except Exception as e:
+                log.error("Error en OCR compartido (cámara %s): %s", escaner.id_camara, e)
+            finally:
+                for escaner, _ in trabajos:
+                    escaner._ocr_terminado()
+
+    def _completar_lote(self, trabajos):
+        """Junta frames de las cámaras por turnos hasta llenar el lote o agotar la espera máxima"""
+        limite = time.perf_counter() + self.espera_lote
+        while len(trabajos) < self.tamano_lote and self.activo:
+            trabajo = self._siguiente_trabajo()
+            if trabajo is not None:
+                self.atendidos[trabajo[0].id_camara] += 1
+                trabajos.append(trabajo)
+                continue
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            self._evento.clear()
+            self._evento.wait(restante)
+        return trabajos
+
+    def _procesar_lote(self, trabajos):
+        """Analiza los frames del lote juntos y entrega cada resultado al escáner de su cámara"""
+        inicio = time.perf_counter()
+        try:
+            resultados = self.motor.analizar_lote([frame for _, frame in trabajos])
+            error = None
+        except Exception as e:
+            resultados, error = [None] * len(trabajos), str(e)
+        latencia = time.perf_counter() - inicio
+        for escaner, _ in trabajos:
+            escaner.latencias_ocr.append(latencia)
+        for (escaner, _), lecturas in zip(trabajos, resultados):
+            escaner._atender_lecturas(lecturas, error)
+
+    def _siguiente_trabajo(self):
+        """Toma un frame de la siguiente cámara con trabajo, rotando el turno para ser justo"""
+        escaneres = list(self.escaneres)
+        total = len(escaneres)
+        for paso in range(total):
+            escaner = escaneres[(self._turno + paso) % total]
+            if not escaner.ocr_running or escaner.pausado:
+                continue
+            try:
+                frame = escaner.ocr_queue.get_nowait()
+            except queue.Empty:
+                continue
+            self._turno = (self._turno + paso + 1) % total
+            return escaner, frame
+        return None
+
+
+class GestorMultiCamara:
+    """
+    Varias cámaras (una por línea de servicio) en un solo proceso. Cada cámara tiene su propio
+    escáner para captura, vista previa y consenso, pero todas comparten un modelo EasyOCR o un
+    pool de procesos OCR. Los callbacks reciben el identificador de la cámara como primer argumento.
+    """
+
+    def __init__(self, on_cedula_found: Callable[[str, str], None],
+                 on_scan_failed: Callable[[str], None] = None,
+                 on_frame_update: Callable[[str, bytes], None] = None,
+                 procesos_ocr=0, tamano_lote=4, espera_lote=0.05):
+        self.on_cedula_found = on_cedula_found
+        self.on_scan_failed = on_scan_failed
+        self.on_frame_update = on_frame_update
+        self.procesos_ocr = procesos_ocr
+        self.tamano_lote = tamano_lote  # Frames por llamada al reconocedor (solo sin pool de procesos)
+        self.espera_lote = espera_lote
+
+        self.motor = MotorOCR()
+        self.pool = None
+        self.planificador = None
+        self.escaneres = {}
+        # Un solo hilo entrega en orden los eventos de todas las cámaras
+        self.despachador = DespachadorEventos(maximo=64)
+
+    def agregar_camara(self, id_camara, fuente: FuenteFrames = None):
+        """
+        Registra una cámara (por defecto el índice numérico de id_camara o 0) y devuelve su escáner.
+        Si el gestor ya está iniciado, la cámara se conecta al OCR compartido y empieza a escanear.
+        """
+        if id_camara in self.escaneres:
+            raise ValueError(f"La cámara '{id_camara}' ya está registrada")
+        if fuente is None:
+            fuente = FuenteCamara(id_camara if isinstance(id_camara, int) else 0)
+
+        escaner = EscanerCedula(
+            on_cedula_found=lambda cedula: self.on_cedula_found(id_camara, cedula),
+            on_scan_failed=lambda: self.on_scan_failed(id_camara) if self.on_scan_failed else None,
+            on_frame_update=lambda img_bytes: self.on_frame_update(id_camara, img_bytes) if self.on_frame_update else None,
+            fuente=fuente
+        )
+        escaner.id_camara = id_camara
+        escaner.despachador = self.despachador
+        # Cada controlador solo vería su parte del OCR compartido; los parámetros se fijan a mano
+        escaner.control_adaptativo = False
+
+        if self.planificador is not None:
+            if self.pool is not None:
+                # Los buffers del pool ya existen: un frame más grande no entraría
+                if not fuente.esta_abierta():
+                    fuente.abrir()
+                bytes_frame = escaner._bytes_frame_ocr()
+                if bytes_frame and bytes_frame > self.pool.bytes_por_frame:
+                    fuente.liberar()
+                    raise ValueError(f"Los frames de la cámara '{id_camara}' no caben en los buffers del pool OCR")
+            # Sin esto el escáner cargaría su propio modelo en inicializar()
+            self.planificador.registrar(escaner)
+            self.escaneres[id_camara] = escaner
+            escaner.iniciar_escaneo()
+        else:
+            self.escaneres[id_camara] = escaner
+        return escaner
+
+    def iniciar(self):
+        """Carga el OCR compartido una sola vez y arranca todas las cámaras"""
+        if self.planificador is None:
+            if self.procesos_ocr > 0:
+                # Los buffers compartidos deben admitir el frame OCR más grande de todas las cámaras
+                for escaner in self.escaneres.values():
+                    if not escaner.fuente.esta_abierta():
+                        escaner.fuente.abrir()
+                tamanos = [escaner._bytes_frame_ocr() for escaner in self.escaneres.values()]
+                opciones = {"bytes_por_frame": max(tamanos)} if tamanos and all(tamanos) else {}
+                self.pool = PoolOCR(self.procesos_ocr, on_resultado=lambda lecturas, error: None,
+                                    config_motor=self.motor.configuracion(), **opciones)
+                self.pool.iniciar()
+            else:
+                log.info("Iniciando EasyOCR compartido...")
+                self.motor.cargar()
+
+            self.planificador = PlanificadorOCR(self.motor, self.pool, self.tamano_lote, self.espera_lote)
+            for escaner in self.escaneres.values():
+                self.planificador.registrar(escaner)
+            self.planificador.iniciar()
+
+        self.despachador.iniciar()
+        for escaner in self.escaneres.values():
+            escaner.iniciar_escaneo()
+
+    def pausar(self, id_camara):
+        self.escaneres[id_camara].pausar()
+
+    def reanudar(self, id_camara):
+        self.escaneres[id_camara].reanudar()
+
+    def cerrar(self):
+        """Detiene todas las cámaras y libera el OCR compartido"""
+        for escaner in self.escaneres.values():
+            escaner.cerrar()
+        self.despachador.detener()
+        if self.planificador:
+            self.planificador.detener()
+            self.planificador = None
+        if self.pool:
+            self.pool.cerrar()
+            self.pool = None
+        self.motor.reader = None
+
+    def obtener_estadisticas(self):
+        """
+        {"camaras": {id: estadísticas}, "compartido": {...}}. Por cámara van las de su escáner (ver
+        EscanerCedula.obtener_estadisticas) más los frames que el planificador le atendió. El OCR y
+        la cola de eventos son compartidos y sus lotes mezclan cámaras, así que sus latencias y
+        contadores se informan una sola vez en "compartido".
+        """
+        etapas_ocr = self.motor.metricas.resumen()
+        camaras = {}
+        for id_camara, escaner in self.escaneres.items():
+            estadisticas = escaner.obtener_estadisticas()
+            for etapa in etapas_ocr:
+                estadisticas["etapas"].pop(etapa, None)
+            for contador in ("lecturas_reconocedor", "lecturas_easyocr"):
+                estadisticas["contadores"].pop(contador, None)
+            estadisticas.pop("eventos", None)
+            estadisticas["contadores"]["ocr_atendidos"] = (
+                self.planificador.atendidos.get(id_camara, 0) if self.planificador else 0
+            )
+            camaras[id_camara] = estadisticas
+        compartido = {
+            "etapas": {**etapas_ocr, **self.despachador.metricas.resumen()},
+            "lecturas_reconocedor": self.motor.lecturas_reconocedor,
+            "lecturas_easyocr": self.motor.lecturas_easyocr,
+            "eventos": {
+                "pendientes": self.despachador.pendientes(),
+                "entregados": self.despachador.entregados,
+                "descartados": self.despachador.descartados,
+            },
+        }
+        if self.pool:
+            compartido["pool_ocr"] = {
+                "procesos": self.pool.num_procesos,
+                "procesos_vivos": self.pool.procesos_vivos(),
+                "reinicios": sum(self.pool.reinicios),
+                "trabajos_perdidos": self.pool.trabajos_perdidos,
+            }
+        return {"camaras": camaras, "compartido": compartido}
@@ -0,0 +1,269 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+from motor_ocr import MotorOCR
+from bitacora import obtener_logger
+
+log = obtener_logger("pool_ocr")
+
+
+def _trabajador_ocr(nombres_buffers, cola_trabajos, cola_resultados, config_motor):
+    """Proceso trabajador: carga EasyOCR una sola vez y analiza los frames que llegan por memoria compartida"""
+    buffers = [shared_memory.SharedMemory(name=nombre) for nombre in nombres_buffers]
+    try:
+        motor = MotorOCR(**config_motor)
+        motor.cargar()
+        while True:
+            trabajo = cola_trabajos.get()
+            if trabajo is None:
+                break
+
+            secuencia, indice, forma = trabajo
+            frame = np.ndarray(forma, dtype=np.uint8, buffer=buffers[indice].buf)
+            try:
+                lecturas, error = motor.analizar(frame), None
+            except Exception as e:
+                lecturas, error = None, str(e)
+            # Soltar la vista antes de devolver el buffer para que pueda reutilizarse
+            del frame
+            cola_resultados.put((secuencia, indice, lecturas, error))
+    finally:
+        for buffer in buffers:
+            buffer.close()
+
+
+class PoolOCR:
+    """
+    Reparte el OCR entre varios procesos; los frames viajan por memoria compartida y los resultados
+    vuelven en orden. Si un proceso muere, sus trabajos se entregan con error y se lo reinicia.
+    """
+
+    def __init__(self, num_procesos, on_resultado, config_motor=None,
+                 bytes_por_frame=1280 * 720 * 3, buffers_por_proceso=2, reinicios_maximos=3):
+        self.num_procesos = num_procesos
+        self.on_resultado = on_resultado  # Recibe (lecturas, error) en el mismo orden en que se enviaron los frames
+        self.config_motor = config_motor or {}
+        self.bytes_por_frame = bytes_por_frame
+        self.num_buffers = num_procesos * buffers_por_proceso
+        self.reinicios_maximos = reinicios_maximos  # Por proceso; luego queda fuera del reparto
+
+        self.buffers = []
+        self.libres = queue.Queue()
+        self.procesos = []
+        self.colas_trabajos = []  # Una por proceso: así se sabe qué trabajos se pierden si muere
+        self.cola_resultados = None
+        self.hilo_resultados = None
+        self.activo = False
+        self._contexto = None
+
+        self._lock = threading.Lock()
+        self.siguiente_secuencia = 0
+        self.proxima_entrega = 0
+        self.enviados = 0
+        self.descartados = 0
+        self.reinicios = [0] * num_procesos
+        self.trabajos_perdidos = 0
+
+        # Trabajos en curso: secuencia -> (proceso, buffer)
+        self._en_curso = {}
+        # Latencia desde el envío hasta la respuesta (incluye la espera en la cola de trabajos)
+        self._instantes_envio = {}
+        self._destinos = {}  # Secuencia -> callback propio (p. ej. el escáner de cada cámara)
+        self.latencias = deque(maxlen=20)
+        self.tiempo_total = 0.0
+
+    def iniciar(self):
+        """Crea los buffers compartidos y lanza los procesos trabajadores"""
+        if self.activo:
+            return
+
+        self._contexto = mp.get_context("spawn")
+        self.siguiente_secuencia = 0
+        self.proxima_entrega = 0
+        self._en_curso = {}
+        self._instantes_envio = {}
+        self._destinos = {}
+        self.reinicios = [0] * self.num_procesos
+        self.buffers = [
+            shared_memory.SharedMemory(create=True, size=self.bytes_por_frame)
+            for _ in range(self.num_buffers)
+        ]
+        for indice in range(self.num_buffers):
+            self.libres.put(indice)
+
+        self.cola_resultados = self._contexto.Queue()
+        self.procesos = [None] * self.num_procesos
+        self.colas_trabajos = [None] * self.num_procesos
+
+        log.info("Iniciando %s procesos OCR...", self.num_procesos)
+        for numero in range(self.num_procesos):
+            self._lanzar_proceso(numero)
+
+        self.activo = True
+        self.hilo_resultados = threading.Thread(target=self._loop_resultados, daemon=True)
+        self.hilo_resultados.start()
+
+    def _lanzar_proceso(self, numero):
+        cola_trabajos = self._contexto.Queue()
+        proceso = self._contexto.Process(
+            target=_trabajador_ocr,
+            args=([buffer.name for buffer in self.buffers], cola_trabajos, self.cola_resultados, self.config_motor),
+            daemon=True
+        )
+        proceso.start()
+        with self._lock:
+            self.colas_trabajos[numero] = cola_trabajos
+            self.procesos[numero] = proceso
+
+    def procesos_vivos(self):
+        return sum(1 for proceso in self.procesos if proceso is not None)
+
+    def enviar(self, frame, timeout=None, destino=None):
+        """
+        Copia el frame a un buffer libre y lo encola; devuelve False si no se liberó ningún buffer a
+        tiempo o no queda ningún proceso. Si se indica destino, el resultado de este frame se entrega
+        ahí en lugar de on_resultado.
+        """
+        if frame.dtype != np.uint8 or frame.nbytes > self.bytes_por_frame:
+            raise ValueError("El frame no cabe en los buffers compartidos del pool OCR")
+
+        try:
+            indice = self.libres.get(timeout=timeout)
+        except queue.Empty:
+            self.descartados += 1
+            return False
+
+        vista = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.buffers[indice].buf)
+        vista[...] = frame
+        del vista
+
+        with self._lock:
+            # El proceso con menos trabajos en curso
+            cargas = {numero: 0 for numero, proceso in enumerate(self.procesos) if proceso is not None}
+            if not cargas:
+                self.libres.put(indice)
+                self.descartados += 1
+                return False
+            for numero, _ in self._en_curso.values():
+                if numero in cargas:
+                    cargas[numero] += 1
+            numero = min(cargas, key=cargas.get)
+
+            secuencia = self.siguiente_secuencia
+            self.siguiente_secuencia += 1
+            self._en_curso[secuencia] = (numero, indice)
+            self._instantes_envio[secuencia] = time.perf_counter()
+            if destino is not None:
+                self._destinos[secuencia] = destino
+            cola_trabajos = self.colas_trabajos[numero]
+        cola_trabajos.put((secuencia, indice, frame.shape))
+        self.enviados += 1
+        return True
+
+    def _loop_resultados(self):
+        """Recibe resultados de los trabajadores, libera sus buffers y los entrega en orden de envío"""
+        pendientes = {}
+        proxima_revision = 0.0
+        while self.activo:
+            try:
+                resultado = self.cola_resultados.get(timeout=0.1)
+            except queue.Empty:
+                resultado = None
+            except (EOFError, OSError):
+                break
+
+            if resultado is not None:
+                self._recibir(resultado, pendientes)
+            # Aunque los demás procesos sigan respondiendo, un proceso muerto se detecta a tiempo
+            if time.monotonic() >= proxima_revision:
+                self._revisar_procesos(pendientes)
+                proxima_revision = time.monotonic() + 0.5
+            self._entregar(pendientes)
+
+    def _recibir(self, resultado, pendientes):
+        secuencia, indice, lecturas, error = resultado
+        with self._lock:
+            en_curso = self._en_curso.pop(secuencia, None)
+            instante_envio = self._instantes_envio.pop(secuencia, None)
+        if en_curso is None:
+            # Ya se dio por perdido (su proceso murió) y el buffer se devolvió entonces
+            return
+        self.libres.put(indice)
+        pendientes[secuencia] = (lecturas, error)
+        if instante_envio is not None:
+            latencia = time.perf_counter() - instante_envio
+            self.latencias.append(latencia)
+            self.tiempo_total += latencia
+
+    def _revisar_procesos(self, pendientes):
+        """Da por perdidos los trabajos de los procesos muertos y los reinicia (hasta reinicios_maximos)"""
+        for numero, proceso in enumerate(self.procesos):
+            if proceso is None or proceso.is_alive():
+                continue
+            with self._lock:
+                perdidos = [(secuencia, indice) for secuencia, (dueno, indice) in self._en_curso.items() if dueno == numero]
+                for secuencia, _ in perdidos:
+                    del self._en_curso[secuencia]
+                    self._instantes_envio.pop(secuencia, None)
+                self.procesos[numero] = None
+            # El proceso muerto ya no escribe en estos buffers
+            for secuencia, indice in perdidos:
+                self.libres.put(indice)
+                pendientes[secuencia] = (None, f"El proceso OCR {numero} terminó inesperadamente")
+            self.trabajos_perdidos += len(perdidos)
+
+            if self.reinicios[numero] < self.reinicios_maximos:
+                self.reinicios[numero] += 1
+                log.error("El proceso OCR %s terminó (código %s); se reinicia (%s/%s)",
+                          numero, proceso.exitcode, self.reinicios[numero], self.reinicios_maximos)
+                self._lanzar_proceso(numero)
+            else:
+                log.error("El proceso OCR %s terminó (código %s) y no se reinicia más; quedan %s procesos",
+                          numero, proceso.exitcode, self.procesos_vivos())
+
+    def pendientes(self):
+        """Trabajos enviados cuyo resultado todavía no se entregó"""
+        return self.siguiente_secuencia - self.proxima_entrega
+
+    def _entregar(self, pendientes):
+        while self.proxima_entrega in pendientes:
+            lecturas, error = pendientes.pop(self.proxima_entrega)
+            with self._lock:
+                destino = self._destinos.pop(self.proxima_entrega, self.on_resultado)
+            try:
+                destino(lecturas, error)
+            except Exception as e:
+                log.error("Error entregando resultado OCR: %s", e)
+            # Después del callback: pendientes() no llega a 0 mientras se atiende el último resultado
+            self.proxima_entrega += 1
+
+    def cerrar(self):
+        """Detiene los procesos trabajadores y libera la memoria compartida"""
+        if not self.procesos and not self.buffers:
+            return
+
+        self.activo = False
+        if self.hilo_resultados and self.hilo_resultados is not threading.current_thread():
+            self.hilo_resultados.join(timeout=1.0)
+
+        for proceso, cola_trabajos in zip(self.procesos, self.colas_trabajos):
+            if proceso is not None:
+                cola_trabajos.put(None)
+        for proceso in self.procesos:
+            if proceso is None:
+                continue
+            proceso.join(timeout=2.0)
+            if proceso.is_alive():
+                proceso.terminate()
+        self.procesos = []
+        self.colas_trabajos = []
+
+        for buffer in self.buffers:
+            buffer.close()
+            buffer.unlink()
+        self.buffers = []
+        self.libres = queue.Queue()
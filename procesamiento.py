@@ -0,0 +1,375 @@
+import cv2
+import numpy as np
+
+
+class LocalizadorCedula:
+    """
+    Localiza el cuadrilátero de la cédula en el frame y lo endereza. El recorte conserva el tamaño
+    con que se ve la tarjeta (nunca se amplía) hasta un máximo canónico: a 512 px de ancho la línea
+    del número ya mide unos 25 px de alto, suficiente para el detector y el reconocedor.
+    """
+
+    # Proporción de una tarjeta ID-1 (85.6 mm x 54 mm)
+    PROPORCION_TARJETA = 85.6 / 54.0
+
+    def __init__(self, ancho_salida=512, alto_salida=323, ancho_deteccion=320,
+                 area_minima=0.08, tolerancia_proporcion=0.35, ancho_minimo=256, paso_ancho=32):
+        self.ancho_salida = ancho_salida  # Máximo: tarjetas más grandes en el frame se reducen a este ancho
+        self.alto_salida = alto_salida
+        self.ancho_minimo = ancho_minimo
+        # El ancho se redondea a múltiplos del paso para que los perfiles reutilicen sus buffers
+        self.paso_ancho = paso_ancho
+        self.ancho_deteccion = ancho_deteccion  # La búsqueda de contornos se hace en miniatura
+        self.area_minima = area_minima  # Fracción mínima del frame que debe ocupar la tarjeta
+        self.tolerancia_proporcion = tolerancia_proporcion
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        self._destinos = {}  # (ancho, alto) -> esquinas de destino
+
+    def localizar(self, frame):
+        """Devuelve las 4 esquinas de la cédula en coordenadas del frame, o None si no hay tarjeta"""
+        height, width = frame.shape[:2]
+        escala = min(1.0, self.ancho_deteccion / float(width))
+        if escala < 1.0:
+            pequeno = cv2.resize(frame, (int(width * escala), int(height * escala)), interpolation=cv2.INTER_AREA)
+        else:
+            pequeno = frame
+
+        gray = cv2.cvtColor(pequeno, cv2.COLOR_BGR2GRAY) if pequeno.ndim == 3 else pequeno
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        bordes = cv2.Canny(gray, 50, 150)
+        bordes = cv2.dilate(bordes, self.kernel, iterations=1)
+
+        contornos, _ = cv2.findContours(bordes, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        area_frame = float(gray.shape[0] * gray.shape[1])
+
+        for contorno in sorted(contornos, key=cv2.contourArea, reverse=True)[:5]:
+            area = cv2.contourArea(contorno)
+            if area < self.area_minima * area_frame:
+                break
+
+            perimetro = cv2.arcLength(contorno, True)
+            aproximado = cv2.approxPolyDP(contorno, 0.02 * perimetro, True)
+            if len(aproximado) != 4 or not cv2.isContourConvex(aproximado):
+                continue
+
+            esquinas = self._ordenar_esquinas(aproximado.reshape(4, 2).astype(np.float32))
+            if not self._proporcion_valida(esquinas):
+                continue
+
+            return esquinas / escala
+
+        return None
+
+    def recortar(self, frame):
+        """Devuelve (recorte normalizado, matriz inversa) o (None, None) si no se encontró la cédula"""
+        esquinas = self.localizar(frame)
+        if esquinas is None:
+            return None, None
+
+        tamano = self._tamano_salida(esquinas)
+        matriz = cv2.getPerspectiveTransform(esquinas, self._destino(tamano))
+        recorte = cv2.warpPerspective(frame, matriz, tamano)
+        return recorte, np.linalg.inv(matriz)
+
+    def _tamano_salida(self, esquinas):
+        """(ancho, alto) del recorte: el ancho con que se ve la tarjeta, acotado y redondeado al paso"""
+        ancho_visto = max(np.linalg.norm(esquinas[1] - esquinas[0]), np.linalg.norm(esquinas[2] - esquinas[3]))
+        ancho = int(ancho_visto // self.paso_ancho) * self.paso_ancho
+        ancho = min(self.ancho_salida, max(self.ancho_minimo, ancho))
+        return ancho, int(round(ancho * self.alto_salida / float(self.ancho_salida)))
+
+    def _destino(self, tamano):
+        destino = self._destinos.get(tamano)
+        if destino is None:
+            ancho, alto = tamano
+            destino = np.array([[0, 0], [ancho - 1, 0], [ancho - 1, alto - 1], [0, alto - 1]], dtype=np.float32)
+            self._destinos[tamano] = destino
+        return destino
+
+    def mapear_a_frame(self, bbox, matriz_inversa):
+        """Convierte un bbox en coordenadas del recorte a coordenadas del frame original"""
+        puntos = np.array(bbox, dtype=np.float32).reshape(-1, 1, 2)
+        transformados = cv2.perspectiveTransform(puntos, matriz_inversa)
+        return [[float(x), float(y)] for x, y in transformados.reshape(-1, 2)]
+
+    def _ordenar_esquinas(self, puntos):
+        """Ordena las esquinas como sup-izq, sup-der, inf-der, inf-izq con el lado largo horizontal"""
+        suma = puntos.sum(axis=1)
+        diferencia = np.diff(puntos, axis=1).ravel()
+        ordenadas = np.array([
+            puntos[np.argmin(suma)],
+            puntos[np.argmin(diferencia)],
+            puntos[np.argmax(suma)],
+            puntos[np.argmax(diferencia)],
+        ], dtype=np.float32)
+
+        ancho = np.linalg.norm(ordenadas[1] - ordenadas[0])
+        alto = np.linalg.norm(ordenadas[3] - ordenadas[0])
+        if alto > ancho:
+            # Tarjeta en vertical: rotar el orden para que el recorte salga apaisado
+            ordenadas = np.roll(ordenadas, -1, axis=0)
+        return ordenadas
+
+    def _proporcion_valida(self, esquinas):
+        """Verifica que el cuadrilátero tenga aproximadamente la proporción de una cédula"""
+        ancho = (np.linalg.norm(esquinas[1] - esquinas[0]) + np.linalg.norm(esquinas[2] - esquinas[3])) / 2
+        alto = (np.linalg.norm(esquinas[3] - esquinas[0]) + np.linalg.norm(esquinas[2] - esquinas[1])) / 2
+        if alto == 0:
+            return False
+        proporcion = ancho / alto
+        return abs(proporcion - self.PROPORCION_TARJETA) <= self.tolerancia_proporcion * self.PROPORCION_TARJETA
+
+
+def puntuar_nitidez(frame, ancho_muestra=160, fraccion_central=0.6):
+    """Puntaje barato de nitidez: varianza del Laplaciano sobre la zona central en miniatura"""
+    height, width = frame.shape[:2]
+    margen_x = int(width * (1 - fraccion_central) / 2)
+    margen_y = int(height * (1 - fraccion_central) / 2)
+    region = frame[margen_y:height - margen_y, margen_x:width - margen_x]
+
+    escala = min(1.0, ancho_muestra / float(region.shape[1]))
+    if escala < 1.0:
+        region = cv2.resize(region, (int(region.shape[1] * escala), int(region.shape[0] * escala)),
+                            interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == 3 else region
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+try:
+    # libjpeg-turbo directo si está instalado (pip install PyTurboJPEG); si no, cv2.imencode
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbojpeg = TurboJPEG()
+except Exception:
+    _turbojpeg = None
+
+
+class CodificadorPreview:
+    """Codifica la vista previa a JPEG directamente desde BGR con un único redimensionado"""
+
+    def __init__(self, ancho=800, calidad=70):
+        self.ancho = ancho  # Ancho máximo de la imagen enviada a la UI
+        self.calidad = calidad
+        self._parametros = [cv2.IMWRITE_JPEG_QUALITY, calidad]
+        self._buffer = None  # Imagen escalada reutilizada entre frames
+
+    def configurar(self, ancho=None, calidad=None):
+        """Cambia el tamaño o la calidad de la vista previa sin afectar al OCR"""
+        if ancho is not None:
+            self.ancho = ancho
+        if calidad is not None:
+            self.calidad = calidad
+            self._parametros = [cv2.IMWRITE_JPEG_QUALITY, calidad]
+
+    def escalar(self, frame, copiar=False):
+        """
+        Devuelve (imagen, escala) con el frame reducido al ancho de la vista previa. La imagen es
+        un buffer propio del codificador salvo que no haga falta reducir ni copiar.
+        """
+        height, width = frame.shape[:2]
+        if width <= self.ancho:
+            if not copiar:
+                return frame, 1.0
+            forma = frame.shape
+        else:
+            forma = (int(height * self.ancho / width), self.ancho) + frame.shape[2:]
+
+        if self._buffer is None or self._buffer.shape != forma:
+            self._buffer = np.empty(forma, dtype=frame.dtype)
+
+        if forma == frame.shape:
+            np.copyto(self._buffer, frame)
+            return self._buffer, 1.0
+        cv2.resize(frame, (forma[1], forma[0]), dst=self._buffer, interpolation=cv2.INTER_AREA)
+        return self._buffer, forma[1] / float(width)
+
+    def codificar(self, imagen):
+        """Codifica una imagen BGR a bytes JPEG"""
+        if _turbojpeg is not None:
+            return _turbojpeg.encode(imagen, quality=self.calidad, pixel_format=TJPF_BGR)
+        ok, datos = cv2.imencode('.jpg', imagen, self._parametros)
+        if not ok:
+            raise Exception("No se pudo codificar la vista previa")
+        return datos.tobytes()
+
+
+class LectorQR:
+    """Decodifica el código QR con el codigo_hash del estudiante; mucho más barato que el OCR"""
+
+    def __init__(self, ancho_deteccion=960):
+        self.detector = cv2.QRCodeDetector()
+        self.ancho_deteccion = ancho_deteccion  # Frames más anchos se reducen antes de buscar el código
+        self._gris = None  # Buffer reutilizado para la versión en grises (y reducida) del frame
+
+    def leer(self, frame):
+        """Devuelve (codigo_hash, esquinas en coordenadas del frame) o None si no hay un código válido"""
+        height, width = frame.shape[:2]
+        escala = min(1.0, self.ancho_deteccion / float(width))
+        forma = (int(height * escala), int(width * escala))
+        if self._gris is None or self._gris.shape != forma:
+            self._gris = np.empty(forma, dtype=np.uint8)
+
+        if frame.ndim == 3:
+            if escala < 1.0:
+                reducido = cv2.resize(frame, (forma[1], forma[0]), interpolation=cv2.INTER_AREA)
+                cv2.cvtColor(reducido, cv2.COLOR_BGR2GRAY, dst=self._gris)
+            else:
+                cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gris)
+        else:
+            cv2.resize(frame, (forma[1], forma[0]), dst=self._gris, interpolation=cv2.INTER_AREA)
+
+        texto, puntos, _ = self.detector.detectAndDecode(self._gris)
+        texto = (texto or "").strip().lower()
+        if not es_codigo_hash(texto) or puntos is None:
+            return None
+        esquinas = (puntos.reshape(-1, 2) / escala).astype(int).tolist()
+        return texto, esquinas
+
+
+def es_codigo_hash(texto):
+    """Un codigo_hash es un SHA-256 en hexadecimal (64 caracteres)"""
+    return len(texto) == 64 and all(c in "0123456789abcdef" for c in texto)
+
+
+def crear_sticker_qr(contenido, leyendas=(), tamano_modulo=8):
+    """Genera la imagen (BGR) de un sticker imprimible: el QR con margen blanco y texto debajo"""
+    qr = cv2.QRCodeEncoder.create().encode(contenido)
+    qr = cv2.resize(qr, None, fx=tamano_modulo, fy=tamano_modulo, interpolation=cv2.INTER_NEAREST)
+    # Zona silenciosa de 4 módulos para que los lectores encuentren el código
+    margen = 4 * tamano_modulo
+    qr = cv2.copyMakeBorder(qr, margen, margen, margen, margen, cv2.BORDER_CONSTANT, value=255)
+
+    alto_linea = 30
+    sticker = np.full((qr.shape[0] + alto_linea * len(leyendas), qr.shape[1], 3), 255, dtype=np.uint8)
+    sticker[:qr.shape[0]] = cv2.cvtColor(qr, cv2.COLOR_GRAY2BGR)
+    for i, leyenda in enumerate(leyendas):
+        (ancho_texto, _), _ = cv2.getTextSize(leyenda, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+        x = max(0, (sticker.shape[1] - ancho_texto) // 2)
+        y = qr.shape[0] + alto_linea * i + 20
+        cv2.putText(sticker, leyenda, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1, cv2.LINE_AA)
+    return sticker
+
+
+class PerfilPreprocesamiento:
+    """
+    Cadena de filtros previa al OCR. Los objetos de cada etapa (CLAHE, kernels) y los buffers se
+    crean una sola vez; cada perfil lleva su costo por frame y su tasa de acierto.
+    """
+
+    nombre = "ninguno"
+
+    def __init__(self):
+        self._gris = None
+        self.frames = 0
+        self.tiempo_total = 0.0
+        self.aciertos = 0  # Frames en los que el OCR devolvió una lectura de 9 dígitos
+
+    def aplicar(self, frame):
+        """Devuelve la imagen preprocesada (un buffer propio del perfil, válido hasta la próxima llamada)"""
+        return self._a_gris(frame)
+
+    def _a_gris(self, frame):
+        if frame.ndim == 2:
+            return frame
+        if self._gris is None or self._gris.shape != frame.shape[:2]:
+            self._gris = np.empty(frame.shape[:2], dtype=np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gris)
+        return self._gris
+
+    def _buffer(self, atributo, forma):
+        buffer = getattr(self, atributo)
+        if buffer is None or buffer.shape != forma:
+            buffer = np.empty(forma, dtype=np.uint8)
+            setattr(self, atributo, buffer)
+        return buffer
+
+    def registrar(self, segundos, acierto):
+        self.frames += 1
+        self.tiempo_total += segundos
+        if acierto:
+            self.aciertos += 1
+
+    def estadisticas(self):
+        return {
+            "frames": self.frames,
+            "costo_promedio_ms": round(1000 * self.tiempo_total / self.frames, 3) if self.frames else None,
+            "tasa_acierto": round(self.aciertos / self.frames, 3) if self.frames else None,
+        }
+
+
+class PerfilRapido(PerfilPreprocesamiento):
+    """Desenfoque de caja 3x3 y CLAHE reutilizado: una fracción del costo del filtro bilateral"""
+
+    nombre = "rapido"
+
+    def __init__(self):
+        super().__init__()
+        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        self._suavizado = None
+        self._salida = None
+
+    def aplicar(self, frame):
+        gray = self._a_gris(frame)
+        suavizado = self._buffer("_suavizado", gray.shape)
+        cv2.blur(gray, (3, 3), dst=suavizado)
+        salida = self._buffer("_salida", gray.shape)
+        self.clahe.apply(suavizado, dst=salida)
+        return salida
+
+
+class PerfilCalidad(PerfilPreprocesamiento):
+    """Filtro bilateral (reduce ruido conservando bordes) y CLAHE: el preprocesamiento original"""
+
+    nombre = "calidad"
+
+    def __init__(self, diametro=9, sigma_color=75, sigma_espacio=75):
+        super().__init__()
+        self.diametro = diametro
+        self.sigma_color = sigma_color
+        self.sigma_espacio = sigma_espacio
+        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        self._suavizado = None
+        self._salida = None
+
+    def aplicar(self, frame):
+        gray = self._a_gris(frame)
+        # bilateralFilter no admite trabajar sobre su propia entrada, por eso un buffer aparte
+        suavizado = self._buffer("_suavizado", gray.shape)
+        cv2.bilateralFilter(gray, self.diametro, self.sigma_color, self.sigma_espacio, dst=suavizado)
+        salida = self._buffer("_salida", gray.shape)
+        self.clahe.apply(suavizado, dst=salida)
+        return salida
+
+
+class PerfilUmbralAdaptativo(PerfilPreprocesamiento):
+    """Umbral adaptativo gaussiano: texto negro sobre blanco aun con iluminación desigual"""
+
+    nombre = "adaptativo"
+
+    def __init__(self, tamano_bloque=31, constante=10):
+        super().__init__()
+        self.tamano_bloque = tamano_bloque
+        self.constante = constante
+        self._suavizado = None
+        self._salida = None
+
+    def aplicar(self, frame):
+        gray = self._a_gris(frame)
+        suavizado = self._buffer("_suavizado", gray.shape)
+        cv2.GaussianBlur(gray, (3, 3), 0, dst=suavizado)
+        salida = self._buffer("_salida", gray.shape)
+        cv2.adaptiveThreshold(suavizado, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                              self.tamano_bloque, self.constante, dst=salida)
+        return salida
+
+
+PERFILES_PREPROCESAMIENTO = {
+    perfil.nombre: perfil
+    for perfil in (PerfilPreprocesamiento, PerfilRapido, PerfilCalidad, PerfilUmbralAdaptativo)
+}
+
+
+def crear_perfil(nombre):
+    """Instancia el perfil de preprocesamiento por nombre ("ninguno", "rapido", "calidad", "adaptativo")"""
+    if nombre not in PERFILES_PREPROCESAMIENTO:
+        raise ValueError(f"Perfil de preprocesamiento desconocido: '{nombre}'")
+    return PERFILES_PREPROCESAMIENTO[nombre]()
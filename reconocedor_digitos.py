@@ -0,0 +1,270 @@
+"""
+Reconocedor liviano de la línea de 9 dígitos de la cédula (segmentación + kNN de cv2.ml).
+Corre antes que EasyOCR; solo si su confianza es baja se recurre al modelo completo.
+
+Entrenamiento a partir de recortes etiquetados (el nombre de cada imagen empieza con la cédula,
+p. ej. 123456789_01.png; sirven los recortes normalizados de la tarjeta o de la línea del número):
+    python reconocedor_digitos.py capturas/ modelo_digitos.npz
+"""
+import argparse
+import os
+import cv2
+import numpy as np
+from bitacora import obtener_logger
+
+log = obtener_logger("reconocedor")
+
+
+class ReconocedorDigitos:
+    """Segmenta la línea del número en glifos y clasifica cada uno con k vecinos más cercanos"""
+
+    TAMANO_GLIFO = (16, 24)  # Ancho y alto del glifo normalizado
+
+    MUESTRAS_CALIBRACION = 1000  # Glifos por dígito como máximo al calibrar el umbral de rechazo
+
+    def __init__(self, k=3, longitud=9, proporcion_linea=(3.0, 14.0), altura_minima=10, percentil_rechazo=95):
+        self.k = k
+        self.longitud = longitud
+        self.proporcion_linea = proporcion_linea  # Ancho/alto de una línea de 9 dígitos (igual que MotorOCR)
+        self.altura_minima = altura_minima
+        self.muestras = np.empty((0, self.TAMANO_GLIFO[0] * self.TAMANO_GLIFO[1]), dtype=np.float32)
+        self.etiquetas = np.empty((0, 1), dtype=np.float32)
+        self.percentil_rechazo = percentil_rechazo
+        self.distancia_maxima = None  # Glifos más lejanos que esto (euclídea) de todo ejemplo no son dígitos
+        self.knn = None
+        # Kernel que une los dígitos de una línea en una sola mancha
+        self._kernel_linea = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3))
+
+    def entrenado(self):
+        return self.knn is not None
+
+    # Entrenamiento
+
+    def agregar_ejemplo(self, imagen, cedula):
+        """Agrega los glifos de la primera línea de la imagen que se segmente en tantos dígitos como cedula"""
+        binaria = self._binarizar(imagen)
+        for rect in self._lineas(binaria):
+            glifos = self._glifos(binaria, rect)
+            if len(glifos) != len(cedula):
+                continue
+            vectores = np.array([self._vector(glifo) for glifo, _ in glifos], dtype=np.float32)
+            etiquetas = np.array([[float(d)] for d in cedula], dtype=np.float32)
+            self.muestras = np.vstack([self.muestras, vectores])
+            self.etiquetas = np.vstack([self.etiquetas, etiquetas])
+            return True
+        return False
+
+    def ejemplos_directorio(self, directorio):
+        """Lista de (nombre, imagen, cédula) de las imágenes del directorio cuyo nombre empieza con la cédula"""
+        ejemplos = []
+        for nombre in sorted(os.listdir(directorio)):
+            cedula = ''.join(c for c in nombre[:self.longitud] if c.isdigit())
+            if len(cedula) != self.longitud:
+                continue
+            imagen = cv2.imread(os.path.join(directorio, nombre))
+            if imagen is not None:
+                ejemplos.append((nombre, imagen, cedula))
+        return ejemplos
+
+    def agregar_ejemplos(self, ejemplos):
+        """Agrega los glifos de cada (nombre, imagen, cédula); devuelve cuántas imágenes se usaron"""
+        usadas = 0
+        for nombre, imagen, cedula in ejemplos:
+            if self.agregar_ejemplo(imagen, cedula):
+                usadas += 1
+            else:
+                log.info("No se pudieron segmentar %s dígitos en '%s'", self.longitud, nombre)
+        return usadas
+
+    def entrenar_desde_directorio(self, directorio):
+        """Agrega todas las imágenes etiquetadas del directorio y entrena; devuelve cuántas se usaron"""
+        usadas = self.agregar_ejemplos(self.ejemplos_directorio(directorio))
+        self.entrenar()
+        return usadas
+
+    def validar(self, ejemplos, confianza_minima=0.8):
+        """
+        Lee imágenes que no se usaron para entrenar. Devuelve cuántas hay, en cuántas se segmentó
+        una línea y cuántas se leyeron bien con confianza >= confianza_minima (la que MotorOCR
+        exige para no recurrir a EasyOCR).
+        """
+        resultado = {"total": len(ejemplos), "segmentadas": 0, "aceptadas": 0}
+        for _, imagen, cedula in ejemplos:
+            lectura = self.reconocer(imagen)
+            if lectura is None:
+                continue
+            resultado["segmentadas"] += 1
+            if lectura[1] == cedula and lectura[2] >= confianza_minima:
+                resultado["aceptadas"] += 1
+        return resultado
+
+    def entrenar(self):
+        """(Re)construye el clasificador con las muestras acumuladas"""
+        if len(self.muestras) < self.k + 1:
+            raise ValueError("No hay suficientes muestras para entrenar el reconocedor de dígitos")
+        self.knn = cv2.ml.KNearest_create()
+        self.knn.train(self.muestras, cv2.ml.ROW_SAMPLE, self.etiquetas)
+
+        self.distancia_maxima = self._calibrar_rechazo()
+
+    def _calibrar_rechazo(self):
+        """
+        Umbral de rechazo (distancia euclídea): percentil alto de las distancias entre glifos de un
+        mismo dígito, sin contar duplicados exactos (frecuentes con recortes de la misma tarjeta).
+        Con una sola tipografía esas distancias son casi nulas, así que el umbral nunca baja de la
+        mitad de la separación entre dígitos distintos: más cerca que eso, el glifo es un dígito.
+        """
+        generador = np.random.default_rng(0)
+        etiquetas = self.etiquetas.ravel()
+        internas, externas = [], []
+        for digito in np.unique(etiquetas):
+            muestras = self.muestras[etiquetas == digito]
+            otras = self.muestras[etiquetas != digito]
+            if len(muestras) > self.MUESTRAS_CALIBRACION:
+                muestras = muestras[generador.choice(len(muestras), self.MUESTRAS_CALIBRACION, replace=False)]
+            if len(otras) > self.MUESTRAS_CALIBRACION:
+                otras = otras[generador.choice(len(otras), self.MUESTRAS_CALIBRACION, replace=False)]
+            distancias = self._distancias(muestras, muestras)[np.triu_indices(len(muestras), 1)]
+            internas.append(distancias[distancias > 1e-6])
+            if len(otras):
+                externas.append(self._distancias(muestras, otras).min(axis=1))
+
+        umbral = None
+        internas = np.concatenate(internas)
+        if len(internas):
+            umbral = float(np.percentile(internas, self.percentil_rechazo))
+        if externas:
+            piso = float(0.5 * np.percentile(np.concatenate(externas), 5))
+            umbral = piso if umbral is None else max(umbral, piso)
+        return umbral
+
+    @staticmethod
+    def _distancias(a, b):
+        """Matriz de distancias euclídeas entre las filas de a y las de b"""
+        cuadrados = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2.0 * a @ b.T
+        return np.sqrt(np.maximum(cuadrados, 0.0))
+
+    def guardar(self, ruta):
+        np.savez_compressed(ruta, muestras=self.muestras, etiquetas=self.etiquetas)
+
+    @classmethod
+    def cargar(cls, ruta, **kwargs):
+        """Carga las muestras guardadas con guardar() y entrena el clasificador (toma milisegundos)"""
+        datos = np.load(ruta)
+        reconocedor = cls(**kwargs)
+        reconocedor.muestras = datos["muestras"].astype(np.float32)
+        reconocedor.etiquetas = datos["etiquetas"].astype(np.float32)
+        reconocedor.entrenar()
+        return reconocedor
+
+    # Reconocimiento
+
+    def reconocer(self, imagen):
+        """
+        Devuelve (bbox de 4 puntos, texto, confianza) de la línea de 9 dígitos mejor reconocida o
+        None si ninguna línea se segmentó en 9 glifos. La confianza es la del dígito más dudoso.
+        """
+        if not self.entrenado():
+            return None
+        binaria = self._binarizar(imagen)
+        mejor = None
+        for rect in self._lineas(binaria):
+            glifos = self._glifos(binaria, rect)
+            if len(glifos) != self.longitud:
+                continue
+            vectores = np.array([self._vector(glifo) for glifo, _ in glifos], dtype=np.float32)
+            _, resultados, vecinos, distancias = self.knn.findNearest(vectores, self.k)
+
+            # Confianza por dígito: acuerdo entre los k vecinos, cero si está lejos de todo ejemplo
+            # (findNearest devuelve distancias al cuadrado)
+            acuerdo = (vecinos == resultados).mean(axis=1)
+            if self.distancia_maxima is not None:
+                acuerdo[np.sqrt(distancias[:, 0]) > self.distancia_maxima] = 0.0
+            confianza = float(acuerdo.min())
+            if mejor is None or confianza > mejor[2]:
+                x, y, w, h = rect
+                bbox = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+                texto = ''.join(str(int(d)) for d in resultados.ravel())
+                mejor = (bbox, texto, confianza)
+        return mejor
+
+    # Segmentación
+
+    def _binarizar(self, imagen):
+        """Texto en blanco sobre negro con umbral de Otsu"""
+        gray = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY) if imagen.ndim == 3 else imagen
+        _, binaria = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        return binaria
+
+    def _lineas(self, binaria):
+        """Rectángulos (x, y, w, h) de manchas con forma de línea de 9 dígitos, de la más ancha a la más angosta"""
+        unida = cv2.morphologyEx(binaria, cv2.MORPH_CLOSE, self._kernel_linea)
+        contornos, _ = cv2.findContours(unida, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        lineas = []
+        for contorno in contornos:
+            x, y, w, h = cv2.boundingRect(contorno)
+            if h >= self.altura_minima and self.proporcion_linea[0] <= w / float(h) <= self.proporcion_linea[1]:
+                lineas.append((x, y, w, h))
+        return sorted(lineas, key=lambda rect: rect[2], reverse=True)
+
+    def _glifos(self, binaria, rect):
+        """Glifos de una línea ordenados de izquierda a derecha como (recorte, rect en la imagen)"""
+        x, y, w, h = rect
+        linea = binaria[y:y + h, x:x + w]
+        contornos, _ = cv2.findContours(linea.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        glifos = []
+        for contorno in contornos:
+            gx, gy, gw, gh = cv2.boundingRect(contorno)
+            # Puntos, guiones y ruido quedan por debajo de la mitad de la altura de la línea
+            if gh >= 0.5 * h:
+                glifos.append((linea[gy:gy + gh, gx:gx + gw], (x + gx, y + gy, gw, gh)))
+        return sorted(glifos, key=lambda glifo: glifo[1][0])
+
+    def _vector(self, glifo):
+        """Centra el glifo en un lienzo con su proporción y lo reduce a TAMANO_GLIFO"""
+        ancho, alto = self.TAMANO_GLIFO
+        gh, gw = glifo.shape
+        lado = max(gh, int(np.ceil(gw * alto / float(ancho))))
+        lienzo = np.zeros((lado, int(np.ceil(lado * ancho / float(alto)))), dtype=np.uint8)
+        oy = (lienzo.shape[0] - gh) // 2
+        ox = (lienzo.shape[1] - gw) // 2
+        lienzo[oy:oy + gh, ox:ox + gw] = glifo
+        return (cv2.resize(lienzo, (ancho, alto), interpolation=cv2.INTER_AREA).ravel() / 255.0).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena el reconocedor de dígitos con recortes etiquetados")
+    parser.add_argument("directorio", help="Carpeta con imágenes cuyo nombre empieza con la cédula")
+    parser.add_argument("salida", help="Archivo .npz donde guardar las muestras")
+    parser.add_argument("--k", type=int, default=3, help="Vecinos a consultar")
+    parser.add_argument("--validacion", type=int, default=5,
+                        help="Reservar una de cada N imágenes para validar antes de guardar (0 no valida)")
+    parser.add_argument("--confianza", type=float, default=0.8,
+                        help="Confianza que deben superar las lecturas de validación (la del motor OCR)")
+    args = parser.parse_args()
+
+    reconocedor = ReconocedorDigitos(k=args.k)
+    ejemplos = reconocedor.ejemplos_directorio(args.directorio)
+    if args.validacion > 1:
+        reservados = ejemplos[::args.validacion]
+        entrenamiento = [e for i, e in enumerate(ejemplos) if i % args.validacion]
+        usadas = reconocedor.agregar_ejemplos(entrenamiento)
+        reconocedor.entrenar()
+        validacion = reconocedor.validar(reservados, args.confianza)
+        if validacion["segmentadas"]:
+            tasa = validacion["aceptadas"] / validacion["segmentadas"]
+            print(f"[INFO] Validación: {validacion['segmentadas']} de {validacion['total']} imágenes reservadas "
+                  f"segmentadas, {tasa:.0%} leídas con confianza >= {args.confianza} "
+                  f"(umbral de rechazo {reconocedor.distancia_maxima:.2f})")
+            if tasa < 0.9:
+                print("[WARN] El reconocedor rechazará muchas lecturas válidas; agregue más ejemplos")
+        usadas += reconocedor.agregar_ejemplos(reservados)
+    else:
+        usadas = reconocedor.agregar_ejemplos(ejemplos)
+    reconocedor.entrenar()
+    reconocedor.guardar(args.salida)
+    print(f"[INFO] {usadas} imágenes, {len(reconocedor.muestras)} glifos guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Servicio sin interfaz: corre EscanerCedula y GestorCedulas en segundo plano y publica las
+detecciones y decisiones por WebSocket en la máquina local, sin Flet ni codificación de la
+vista previa. Clientes livianos (pantallas, indicadores LED) se suscriben a los eventos.
+
+    python servicio.py --puerto 8765
+
+API (solo biblioteca estándar):
+    GET  /eventos             WebSocket con un JSON por evento ("deteccion" o "fallo")
+    GET  /estado              escaneando, pausado y clientes conectados
+    GET  /estadisticas        estadísticas del escáner, de la caché de decisiones y de los eventos
+    GET  /cedulas/<cedula>    registro y decisión de acceso (no escribe en el historial)
+    POST /pausar, /reanudar   controla el escaneo
+"""
+import argparse
+import base64
+import hashlib
+import json
+import queue
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from GestorPrincipal import GestorCedulas
+from IR_scanner import EscanerCedula
+from cache_decisiones import CacheDecisiones
+from indice_cedulas import IndiceCedulas
+from fuentes_video import FuenteCamara, FuenteVideo
+from bitacora import configurar_bitacora, obtener_logger
+
+log = obtener_logger("servicio")
+
+_GUID_WEBSOCKET = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Campos del registro que se publican; el codigo_hash es la credencial del QR y no sale del equipo
+CAMPOS_PUBLICOS = ("numero_de_cedula", "nombre_estudiante", "especialidad", "año", "sección")
+
+
+class ClienteEventos:
+    """Conexión WebSocket suscrita a los eventos, con su propia cola acotada"""
+
+    def __init__(self, conexion, max_pendientes=64):
+        self.conexion = conexion
+        self.pendientes = queue.Queue(maxsize=max_pendientes)
+        self.descartados = 0
+        self.activo = True
+        self._lock_envio = threading.Lock()
+
+    def encolar(self, mensaje):
+        """Encola sin bloquear; si el cliente no da abasto se descarta el evento más antiguo"""
+        while True:
+            try:
+                self.pendientes.put_nowait(mensaje)
+                return
+            except queue.Full:
+                try:
+                    self.pendientes.get_nowait()
+                    self.descartados += 1
+                except queue.Empty:
+                    pass
+
+    def enviar(self, datos, opcode=0x1):
+        """Envía un frame WebSocket sin máscara (los del servidor nunca la llevan)"""
+        largo = len(datos)
+        if largo < 126:
+            cabecera = struct.pack("!BB", 0x80 | opcode, largo)
+        elif largo < 65536:
+            cabecera = struct.pack("!BBH", 0x80 | opcode, 126, largo)
+        else:
+            cabecera = struct.pack("!BBQ", 0x80 | opcode, 127, largo)
+        with self._lock_envio:
+            self.conexion.sendall(cabecera + datos)
+
+    def leer_frame(self, archivo):
+        """Lee un frame del cliente (siempre enmascarado); devuelve (opcode, datos) o None si se cerró"""
+        cabecera = archivo.read(2)
+        if len(cabecera) < 2:
+            return None
+        opcode = cabecera[0] & 0x0F
+        largo = cabecera[1] & 0x7F
+        if largo == 126:
+            largo = struct.unpack("!H", archivo.read(2))[0]
+        elif largo == 127:
+            largo = struct.unpack("!Q", archivo.read(8))[0]
+        mascara = archivo.read(4) if cabecera[1] & 0x80 else b"\x00\x00\x00\x00"
+        datos = archivo.read(largo)
+        return opcode, bytes(b ^ mascara[i % 4] for i, b in enumerate(datos))
+
+
+class ManejadorServicio(BaseHTTPRequestHandler):
+    """Rutas REST y la suscripción WebSocket; self.server.servicio es el ServicioEscaner"""
+
+    protocol_version = "HTTP/1.1"  # Los navegadores rechazan el cambio a WebSocket sobre HTTP/1.0
+
+    def do_GET(self):
+        servicio = self.server.servicio
+        if self.path == "/eventos":
+            self._atender_websocket(servicio)
+        elif self.path == "/estado":
+            self._responder(200, servicio.estado())
+        elif self.path == "/estadisticas":
+            self._responder(200, servicio.obtener_estadisticas())
+        elif self.path.startswith("/cedulas/"):
+            cedula = self.path[len("/cedulas/"):]
+            if len(cedula) != 9 or not cedula.isdigit():
+                self._responder(400, {"error": "La cédula debe tener 9 dígitos"})
+                return
+            self._responder(200, servicio.consultar(cedula))
+        else:
+            self._responder(404, {"error": "Ruta no encontrada"})
+
+    def do_POST(self):
+        servicio = self.server.servicio
+        if self.path == "/pausar":
+            servicio.pausar()
+            self._responder(200, servicio.estado())
+        elif self.path == "/reanudar":
+            servicio.reanudar()
+            self._responder(200, servicio.estado())
+        else:
+            self._responder(404, {"error": "Ruta no encontrada"})
+
+    def _responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _atender_websocket(self, servicio):
+        clave = self.headers.get("Sec-WebSocket-Key")
+        if self.headers.get("Upgrade", "").lower() != "websocket" or not clave:
+            self._responder(426, {"error": "Se esperaba una conexión WebSocket"})
+            return
+        aceptacion = base64.b64encode(hashlib.sha1((clave + _GUID_WEBSOCKET).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", aceptacion)
+        self.end_headers()
+        self.wfile.flush()
+
+        cliente = ClienteEventos(self.connection, servicio.max_pendientes)
+        servicio.suscribir(cliente)
+        lector = threading.Thread(target=self._leer_cliente, args=(cliente,), daemon=True)
+        lector.start()
+        try:
+            # Este hilo solo escribe; el lector atiende ping y cierre
+            while cliente.activo and servicio.activo:
+                try:
+                    mensaje = cliente.pendientes.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                cliente.enviar(mensaje)
+        except OSError:
+            pass
+        finally:
+            cliente.activo = False
+            servicio.desuscribir(cliente)
+            self.close_connection = True
+
+    def _leer_cliente(self, cliente):
+        try:
+            while cliente.activo:
+                frame = cliente.leer_frame(self.rfile)
+                if frame is None or frame[0] == 0x8:
+                    try:
+                        cliente.enviar(b"", opcode=0x8)
+                    except OSError:
+                        pass
+                    break
+                if frame[0] == 0x9:
+                    cliente.enviar(frame[1], opcode=0xA)
+        except (OSError, struct.error):
+            pass
+        finally:
+            cliente.activo = False
+
+    def log_message(self, formato, *args):
+        log.debug("%s - " + formato, self.address_string(), *args)
+
+
+class ServicioEscaner:
+    """Escáner y decisión de acceso como servicio de larga duración, sin interfaz gráfica"""
+
+    def __init__(self, host="127.0.0.1", puerto=8765, fuente=None, pausa_tras_deteccion=2.0,
+                 intervalo_fallos=1.0, max_pendientes=64, ttl_decisiones=20.0):
+        self.host = host
+        self.puerto = puerto
+        self.fuente = fuente
+        # Sin nadie que pulse "Continuar", el escaneo se reanuda solo tras este tiempo
+        self.pausa_tras_deteccion = pausa_tras_deteccion
+        self.intervalo_fallos = intervalo_fallos  # Los fallos llegan por frame: se publican como mucho uno por intervalo
+        self.max_pendientes = max_pendientes
+
+        self.gestor = GestorCedulas()
+        self.decisiones = CacheDecisiones(ttl=ttl_decisiones)
+        self.indice_cedulas = IndiceCedulas(registro["numero_de_cedula"] for registro in self.gestor.listar_registros())
+        # El gestor comparte un cursor: detecciones y consultas REST no deben usarlo a la vez
+        self._lock_base = threading.Lock()
+
+        self.escaner = None
+        self.servidor = None
+        self.hilo_servidor = None
+        self._temporizador = None
+        self.activo = False
+
+        self._clientes = set()
+        self._lock_clientes = threading.Lock()
+        self.secuencia = 0
+        self.publicados = 0
+        self.fallos = 0
+        self._fallos_sin_publicar = 0
+        self._ultimo_fallo_publicado = 0.0
+
+    def iniciar(self):
+        """Carga el escáner (sin vista previa) y abre el servidor HTTP/WebSocket"""
+        if self.activo:
+            return
+        self.escaner = EscanerCedula(
+            on_cedula_found=self.on_cedula_found,
+            on_scan_failed=self.on_scan_failed,
+            fuente=self.fuente,
+        )
+        self.escaner.activar_qr(self.resolver_hash)
+        self.escaner.usar_registro(self.indice_cedulas)
+
+        self.servidor = ThreadingHTTPServer((self.host, self.puerto), ManejadorServicio)
+        self.servidor.daemon_threads = True
+        self.servidor.servicio = self
+        self.activo = True
+        self.hilo_servidor = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo_servidor.start()
+        log.info("Servicio escuchando en http://%s:%s (eventos en ws://%s:%s/eventos)",
+                 self.host, self.puerto, self.host, self.puerto)
+
+        self.escaner.iniciar_escaneo()
+
+    def detener(self):
+        """Cierra el servidor, desconecta a los clientes y libera cámara y modelo"""
+        if not self.activo:
+            return
+        self.activo = False
+        if self._temporizador:
+            self._temporizador.cancel()
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        with self._lock_clientes:
+            for cliente in self._clientes:
+                cliente.activo = False
+            self._clientes.clear()
+        self.escaner.cerrar()
+        self.escaner = None
+
+    def pausar(self):
+        """Pausa explícita: cancela la reanudación automática pendiente de la última detección"""
+        if self._temporizador:
+            self._temporizador.cancel()
+            self._temporizador = None
+        if self.activo:
+            self.escaner.pausar()
+
+    def reanudar(self):
+        if self._temporizador:
+            self._temporizador.cancel()
+            self._temporizador = None
+        if self.activo:
+            self.escaner.reanudar()
+
+    # Callbacks del escáner
+
+    def resolver_hash(self, codigo_hash):
+        registro = self.gestor.buscar_por_hash(codigo_hash)
+        return registro["numero_de_cedula"] if registro else None
+
+    def on_cedula_found(self, cedula):
+        """Decide el acceso igual que la interfaz, lo publica y reanuda el escaneo tras la pausa"""
+        self.escaner.pausar()
+        evento = self.decidir(cedula, registrar_paso=True)
+        evento["tipo"] = "deteccion"
+        self.publicar(evento)
+
+        if self._temporizador:
+            self._temporizador.cancel()
+        self._temporizador = threading.Timer(self.pausa_tras_deteccion, self.reanudar)
+        self._temporizador.daemon = True
+        self._temporizador.start()
+
+    def on_scan_failed(self):
+        self.fallos += 1
+        self._fallos_sin_publicar += 1
+        ahora = time.monotonic()
+        if ahora - self._ultimo_fallo_publicado < self.intervalo_fallos:
+            return
+        self._ultimo_fallo_publicado = ahora
+        fallos, self._fallos_sin_publicar = self._fallos_sin_publicar, 0
+        self.publicar({"tipo": "fallo", "frames": fallos})
+
+    # Decisión y consultas
+
+    def decidir(self, cedula, registrar_paso=False):
+        """
+        Decisión de acceso de la cédula (caché de decisiones incluida). Con registrar_paso el
+        historial queda igual que en la interfaz: un estudiante aceptado se agrega con becado "Si" y
+        una cédula no registrada con becado "No", salvo que sea una lectura repetida.
+        """
+        with self._lock_base:
+            decision = self.decisiones.obtener(cedula) if registrar_paso else None
+            repetida = decision is not None
+            if not repetida:
+                decision = self.gestor.evaluar_acceso(cedula)
+                if registrar_paso:
+                    self.decisiones.guardar(cedula, decision)
+
+            registro = decision["registro"]
+            if not registro:
+                resultado = "no_registrado"
+                if registrar_paso and not repetida:
+                    self.gestor.agregar_entrada_historial(cedula, becado="No")
+            elif decision["ya_paso_hoy"]:
+                resultado = "ya_paso_hoy"
+            else:
+                resultado = "aceptado"
+                if registrar_paso and not repetida:
+                    self.gestor.agregar_entrada_historial(cedula, becado="Si")
+
+        return {
+            "cedula": cedula,
+            "resultado": resultado,
+            "repetida": repetida,
+            "estudiante": {campo: registro[campo] for campo in CAMPOS_PUBLICOS} if registro else None,
+        }
+
+    def consultar(self, cedula):
+        """Registro y decisión actual de una cédula sin tocar el historial ni la caché"""
+        return self.decidir(cedula)
+
+    def estado(self):
+        with self._lock_clientes:
+            clientes = len(self._clientes)
+        return {
+            "escaneando": bool(self.escaner and self.escaner.running and not self.escaner.pausado),
+            "pausado": bool(self.escaner and self.escaner.pausado),
+            "clientes": clientes,
+        }
+
+    def obtener_estadisticas(self):
+        with self._lock_clientes:
+            descartados = sum(cliente.descartados for cliente in self._clientes)
+        return {
+            "escaner": self.escaner.obtener_estadisticas() if self.escaner else None,
+            "decisiones": {"aciertos": self.decisiones.aciertos, "fallos": self.decisiones.fallos},
+            "eventos": {
+                "publicados": self.publicados,
+                "fallos": self.fallos,
+                "descartados_clientes_conectados": descartados,
+            },
+            **self.estado(),
+        }
+
+    # Eventos
+
+    def suscribir(self, cliente):
+        with self._lock_clientes:
+            self._clientes.add(cliente)
+        log.info("Cliente de eventos conectado (%s en total)", len(self._clientes))
+
+    def desuscribir(self, cliente):
+        with self._lock_clientes:
+            self._clientes.discard(cliente)
+        log.info("Cliente de eventos desconectado (%s en total)", len(self._clientes))
+
+    def publicar(self, evento):
+        """Serializa el evento una vez y lo encola para cada cliente sin esperar a ninguno"""
+        with self._lock_clientes:
+            self.secuencia += 1
+            evento["secuencia"] = self.secuencia
+            evento["instante"] = time.time()
+            mensaje = json.dumps(evento, ensure_ascii=False, default=str).encode("utf-8")
+            for cliente in self._clientes:
+                cliente.encolar(mensaje)
+            self.publicados += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escáner de cédulas como servicio local sin interfaz")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección donde escuchar (por defecto solo local)")
+    parser.add_argument("--puerto", type=int, default=8765, help="Puerto HTTP/WebSocket")
+    parser.add_argument("--camara", type=int, default=0, help="Índice de la cámara")
+    parser.add_argument("--video", help="Archivo de video a usar en lugar de la cámara")
+    parser.add_argument("--pausa", type=float, default=2.0, help="Segundos de pausa tras cada detección")
+    parser.add_argument("--nivel-log", default="INFO", help="Nivel de la bitácora (DEBUG, INFO, WARNING...)")
+    parser.add_argument("--log", help="Archivo donde guardar también la bitácora")
+    args = parser.parse_args()
+
+    configurar_bitacora(nivel=args.nivel_log, archivo=args.log)
+    fuente = FuenteVideo(args.video, repetir=True) if args.video else FuenteCamara(args.camara)
+    servicio = ServicioEscaner(host=args.host, puerto=args.puerto, fuente=fuente, pausa_tras_deteccion=args.pausa)
+    servicio.iniciar()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servicio.detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,26 @@
 import flet as ft
 from GestorPrincipal import GestorCedulas
 from IR_scanner import EscanerCedula
+from cache_decisiones import CacheDecisiones
+from indice_cedulas import IndiceCedulas
 import base64
 import pygame
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import get_column_letter
 from datetime import datetime
+from bitacora import obtener_logger
+
+log = obtener_logger("ui")
 
 pygame.init()
 pygame.mixer.init()
 
 gestor = GestorCedulas()
+# Decisiones recientes por cédula; evita consultas y filas de historial repetidas mientras la tarjeta sigue a la vista
+decisiones = CacheDecisiones(ttl=20.0)
+# Cédulas registradas en memoria para corregir lecturas con un dígito mal leído
+indice_cedulas = IndiceCedulas(registro["numero_de_cedula"] for registro in gestor.listar_registros())
 
 class CedulaApp:
     def __init__(self):
@@ -696,36 +705,60 @@ class CedulaApp:
     # Métodos para el escáner de cédula
     def on_iniciar_escaneo(self, e):
         """Manejador del evento de clic en el botón Iniciar"""
+        self.detenido = False
+        self.cedula_text.value = "Cédula: Buscando..."
         if self.escaner is None:
             self.status_text.value = "Estado: Inicializando cámara y OCR..."
             self.status_text.color = ft.Colors.ORANGE
-            self.cedula_text.value = "Cédula: Buscando..."
             self.update_ui()
-            self.detenido = False
             # Crear y configurar el escáner
-            if not self.escaner:
-                self.escaner = EscanerCedula(
-                    on_cedula_found=self.on_cedula_found,
-                    on_scan_failed=self.on_scan_failed,
-                    on_frame_update=self.on_frame_update
-                )
-            if self.escaner:
-                print(self.escaner)
+            self.escaner = EscanerCedula(
+                on_cedula_found=self.on_cedula_found,
+                on_scan_failed=self.on_scan_failed,
+                on_frame_update=self.on_frame_update
+            )
+            # La vista previa va a su propio ritmo y solo envía un frame cuando la UI terminó el anterior
+            self.escaner.configurar_preview(fps=12, creditos=1)
+            # Los stickers QR (GestorCedulas.generar_qr) se resuelven por idx_hash antes de recurrir al OCR
+            self.escaner.activar_qr(self.resolver_hash)
+            self.escaner.usar_registro(indice_cedulas)
             # Iniciar escaneo en un hilo separado
             self.escaner.iniciar_escaneo()
+        else:
+            # El modelo y la cámara siguen cargados: reanudar es inmediato
+            self.status_text.value = "Estado: Escaneando..."
+            self.status_text.color = ft.Colors.ORANGE
+            self.update_ui()
+            self.escaner.reanudar()
     
+    def resolver_hash(self, codigo_hash):
+        """Traduce el codigo_hash leído de un QR al número de cédula registrado"""
+        registro = gestor.buscar_por_hash(codigo_hash)
+        return registro["numero_de_cedula"] if registro else None
+
     def on_detener_escaneo(self, e):
         """Manejador del evento de clic en el botón Detener"""
         if self.escaner:
             self.detenido = True
-            self.escaner.detener_escaneo()
+            # Pausar sin descargar el modelo ni cerrar la cámara
+            self.escaner.pausar()
             self.status_text.value = "Estado: Escaneo detenido"
             self.status_text.color = ft.Colors.RED
             self.cedula_text.value = "Cédula: No detectada"
-            self.escaner = None
             self.restablecer_imagen()
             
             self.update_ui()
+    
+    def continuar_escaneo(self, modal_dlg):
+        """Cierra el diálogo de resultado y reanuda el escaneo para el siguiente estudiante"""
+        self.page.close(modal_dlg)
+        self.on_iniciar_escaneo(None)
+    
+    def cerrar_escaner(self):
+        """Libera definitivamente la cámara y el modelo OCR"""
+        if self.escaner:
+            self.escaner.cerrar()
+            self.escaner = None
             
     def restablecer_imagen(self):
         """Método auxiliar para restablecer la imagen a su estado original"""
@@ -850,19 +883,19 @@ class CedulaApp:
             try:
                 self.mostrar_toast(f"Historial exportado a: {nombre_archivo}", ft.Colors.GREEN)
             except Exception as e:
-                print(f"Error al mostrar el toast: {e}")
+                log.error("Error al mostrar el toast: %s", e)
             os.makedirs("historiales", exist_ok=True)
             wb.save(f"historiales/{nombre_archivo}")
 
         except Exception as ex:
-            print(ex)
+            log.error("Error al exportar historial: %s", ex)
             self.mostrar_toast(f"Error al exportar historial: {str(ex)}", ft.Colors.RED)
 
     def on_cedula_found(self, cedula):
         """Callback cuando se encuentra una cédula"""
-        print(f"[INFO] Mostrando modal para cédula: {cedula}")
+        log.info("Mostrando modal para cédula: %s", cedula)
         if not self.page:
-            print("[ERROR] self.page no está inicializado")
+            log.error("self.page no está inicializado")
             return
             
         # Actualizar textos en la interfaz
@@ -871,19 +904,28 @@ class CedulaApp:
         self.status_text.color = ft.Colors.GREEN
         self.cedula_text.value = f"Cédula: {cedula}"
         
-        # Pausar el escaneo temporalmente
+        # Pausar el escaneo temporalmente (cámara y modelo quedan cargados)
         if self.escaner:
-            self.escaner.detener_escaneo()
+            self.escaner.pausar()
         
-        is_registered = gestor.buscar_por_cedula(cedula)
-        already_pass_today = True if len(gestor.buscar_historial_por_cedula(cedula)) > 1 else False
+        # Si la misma tarjeta se acaba de decidir, reutilizar la decisión sin consultar ni escribir en la base
+        decision = decisiones.obtener(cedula)
+        repetida = decision is not None
+        if not repetida:
+            decision = gestor.evaluar_acceso(cedula)
+            decisiones.guardar(cedula, decision)
+        else:
+            log.info("Cédula %s leída de nuevo; se usa la decisión reciente", cedula)
+        is_registered = decision["registro"]
+        already_pass_today = decision["ya_paso_hoy"]
         if is_registered and not already_pass_today:
             # AGREGAR AL HISTORIAL CUANDO SE ESCANEA UNA CÉDULA REGISTRADA
-            try:
-                gestor.agregar_entrada_historial(cedula, becado="Si")
-                print(f"[INFO] Entrada agregada al historial para cédula: {cedula}")
-            except Exception as e:
-                print(f"[ERROR] Error al agregar al historial: {e}")
+            if not repetida:
+                try:
+                    gestor.agregar_entrada_historial(cedula, becado="Si")
+                    log.info("Entrada agregada al historial para cédula: %s", cedula)
+                except Exception as e:
+                    log.error("Error al agregar al historial: %s", e)
             
             # Crear el diálogo modal con todos los datos del estudiante
             modal_dlg = ft.AlertDialog(
@@ -1011,7 +1053,7 @@ class CedulaApp:
                                 icon=ft.Icons.QR_CODE_SCANNER,
                                 color=ft.Colors.WHITE,
                                 bgcolor=ft.Colors.GREEN,
-                                on_click=lambda e: self.page.close(modal_dlg)
+                                on_click=lambda e: self.continuar_escaneo(modal_dlg)
                             )
                         ], 
                         alignment=ft.MainAxisAlignment.END,
@@ -1020,7 +1062,7 @@ class CedulaApp:
                     )
                 ],
                 actions_alignment=ft.MainAxisAlignment.END,
-                on_dismiss=lambda e: self.on_detener_escaneo(e),
+                on_dismiss=lambda e: self.page.close(modal_dlg),
             )
             sonido = pygame.mixer.Sound('assets/success.mp3')
         elif is_registered and already_pass_today:
@@ -1108,7 +1150,7 @@ class CedulaApp:
                                 icon=ft.Icons.REFRESH,
                                 color=ft.Colors.WHITE,
                                 bgcolor=ft.Colors.BLUE,
-                                on_click=lambda e: self.page.close(modal_dlg)
+                                on_click=lambda e: self.continuar_escaneo(modal_dlg)
                             ),
                             ft.OutlinedButton(
                                 "Cerrar",
@@ -1126,7 +1168,8 @@ class CedulaApp:
             )
             sonido = pygame.mixer.Sound('assets/wrong.mp3')
         else:
-            gestor.agregar_entrada_historial(cedula, becado="No")
+            if not repetida:
+                gestor.agregar_entrada_historial(cedula, becado="No")
             # Mostrar diálogo de cédula no registrada (NO se agrega al historial)
             modal_dlg = ft.AlertDialog(
                 modal=True,
@@ -1187,7 +1230,7 @@ class CedulaApp:
                                 icon=ft.Icons.REFRESH,
                                 color=ft.Colors.WHITE,
                                 bgcolor=ft.Colors.BLUE,
-                                on_click=lambda e: self.page.close(modal_dlg)
+                                on_click=lambda e: self.continuar_escaneo(modal_dlg)
                             ),
                             ft.OutlinedButton(
                                 "Cerrar",
@@ -1237,11 +1280,17 @@ class CedulaApp:
     
     def on_frame_update(self, img_bytes):
         """Callback cuando hay un nuevo frame disponible"""
-        if self.img_view and not self.detenido:
-            # Convertir bytes a base64 para mostrar en la imagen
-            base64_img = base64.b64encode(img_bytes).decode('utf-8')
-            self.img_view.content.src_base64 = base64_img
-            self.update_ui()
+        try:
+            if self.img_view and not self.detenido:
+                # Convertir bytes a base64 para mostrar en la imagen
+                base64_img = base64.b64encode(img_bytes).decode('utf-8')
+                self.img_view.content.src_base64 = base64_img
+                # Solo cambia la imagen: no actualizar también los textos de estado
+                self.img_view.update()
+        finally:
+            # Devolver el crédito para que el escáner envíe el siguiente frame
+            if self.escaner:
+                self.escaner.confirmar_frame()
     
     def limpiar_formulario(self):
         """Limpia los campos del formulario"""
@@ -1274,6 +1323,8 @@ class CedulaApp:
             )
             
             if resultado:
+                decisiones.invalidar(self.cedula_input.value)
+                indice_cedulas.agregar(self.cedula_input.value)
                 self.mostrar_toast("Registro creado exitosamente", ft.Colors.GREEN)
                 self.limpiar_formulario()
                 self.cargar_registros()
@@ -1353,6 +1404,8 @@ class CedulaApp:
             resultado = gestor.eliminar_registro(self.buscar_cedula_input.value)
             
             if resultado:
+                decisiones.invalidar(self.buscar_cedula_input.value)
+                indice_cedulas.quitar(self.buscar_cedula_input.value)
                 self.mostrar_toast("Registro eliminado exitosamente", ft.Colors.GREEN)
                 self.resultado_container.visible = False
                 self.buscar_cedula_input.value = ""
@@ -1389,6 +1442,7 @@ class CedulaApp:
             resultado = gestor.actualizar_registro(self.buscar_cedula_input.value, datos_actualizados)
             
             if resultado:
+                decisiones.invalidar(self.buscar_cedula_input.value)
                 self.mostrar_toast("Registro actualizado exitosamente", ft.Colors.GREEN)
                 self.limpiar_formulario()
                 self.buscar_cedula_input.value = ""
@@ -1402,19 +1456,18 @@ class CedulaApp:
             self.mostrar_toast(f"Error al actualizar: {str(ex)}", ft.Colors.RED)
     
     def update_ui(self):
-        """Actualiza componentes específicos de la interfaz de usuario"""
-        if self.img_view:
-            self.img_view.update()
-        if self.status_text:
-            self.status_text.update()
-        if self.cedula_text:
-            self.cedula_text.update()
+        """Actualiza componentes específicos de la interfaz de usuario en un solo envío"""
+        controles = [c for c in (self.img_view, self.status_text, self.cedula_text) if c]
+        if controles:
+            self.page.update(*controles)
 
 
 def main():
     app = CedulaApp()
     # Usar view para asegurar que los diálogos funcionen correctamente
     ft.app(target=app.iniciar_app, view=ft.AppView.FLET_APP)
+    # Al cerrar la ventana, liberar la cámara y el modelo OCR
+    app.cerrar_escaner()
 
 # Ejecución principal
 if __name__ == "__main__":